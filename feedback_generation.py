@@ -1,5 +1,39 @@
-import json
+import bisect
 from datetime import datetime
+from itertools import chain, islice
+
+
+def _progressive_penalty(issue_count, weight):
+    """Progressive penalty - first few issues have less impact, capped at 40 points."""
+    if issue_count <= 0:
+        return 0
+    if issue_count <= 3:
+        penalty = issue_count * weight * 0.5  # 50% penalty for first 3
+    elif issue_count <= 7:
+        penalty = (3 * weight * 0.5) + ((issue_count - 3) * weight * 0.8)  # 80% for next 4
+    else:
+        penalty = (3 * weight * 0.5) + (4 * weight * 0.8) + ((issue_count - 7) * weight)  # Full penalty for rest
+    return min(penalty, 40)  # Cap per category at 40 points
+
+
+# Precomputed file-header underline, sliced to width per file
+_SEP_WIDTH = 256
+_SEP = "─" * _SEP_WIDTH
+
+# Risk thresholds (inclusive lower bounds) and their labels, lowest first
+_RISK_BOUNDS = [15, 40, 80]
+_RISK_LABELS = ["✅ MINIMAL", "🟢 LOW", "🟡 MEDIUM", "🔴 HIGH"]
+
+_RECOMMENDATIONS_HEADER = "\n🚀 SMART RECOMMENDATIONS:\n" + "=" * 30 + "\n"
+_INLINE_COMMENTS_HEADER = "\n💬 INLINE REVIEW COMMENTS:\n" + "=" * 30 + "\n"
+
+# Report tail for a PR with no issues at all
+_CLEAN_REPORT_TAIL = (
+    _RECOMMENDATIONS_HEADER
+    + "✅ No specific recommendations - code looks good!\n"
+    + _INLINE_COMMENTS_HEADER
+    + "ℹ️  No line-specific comments generated.\n"
+)
 
 
 class FeedbackGeneration:
@@ -17,31 +51,40 @@ class FeedbackGeneration:
     
     def generate_comprehensive_feedback(self, analysis_results, pr_data):
         """Generate comprehensive PR review report."""
-        report = self._generate_header(pr_data)
+        # Sections are collected and joined once, so the report is allocated at its final size
+        sections = [self._generate_header(pr_data)]
         
         # File-by-file analysis
         total_issues = 0
-        all_issues = {}
         risk_score = 0
         
         for result in analysis_results:
             file_report, file_issues, file_risk = self._generate_file_report(result)
-            report += file_report
+            sections.append(file_report)
             total_issues += file_issues
             risk_score += file_risk
-            
-            # Aggregate issues by category
-            for category, items in result['issues'].items():
-                if category not in all_issues:
-                    all_issues[category] = []
-                all_issues[category].extend(items)
+        
+        # Aggregate issues by category in a single C-level sweep per category
+        seen_categories = dict.fromkeys(
+            category for result in analysis_results for category in result['issues']
+        )
+        all_issues = {
+            category: list(chain.from_iterable(
+                result['issues'].get(category, []) for result in analysis_results
+            ))
+            for category in seen_categories
+        }
         
         # Overall scoring and recommendations
-        report += self._generate_summary(all_issues, total_issues, risk_score, len(analysis_results))
-        report += self._generate_smart_recommendations(all_issues)
-        report += self._generate_inline_comments_section(analysis_results)
+        sections.append(self._generate_summary(all_issues, total_issues, risk_score, len(analysis_results)))
+        if total_issues == 0:
+            # Clean PR - nothing to recommend or comment on
+            sections.append(_CLEAN_REPORT_TAIL)
+        else:
+            sections.append(self._generate_smart_recommendations(all_issues))
+            sections.append(self._generate_inline_comments_section(analysis_results))
         
-        return report
+        return ''.join(sections)
     
     def _generate_header(self, pr_data):
         """Generate report header with PR metadata."""
@@ -68,51 +111,43 @@ class FeedbackGeneration:
         
         file_issues = sum(len(items) for items in issues.values())
         
-        report = f"\n📄 FILE: {filename}\n"
-        report += "─" * (len(filename) + 8) + "\n"
+        width = len(filename) + 8
+        lines = [
+            f"\n📄 FILE: {filename}\n",
+            (_SEP[:width] if width <= _SEP_WIDTH else "─" * width) + "\n"
+        ]
         
         if file_issues == 0:
-            report += "✅ No issues detected - Great job!\n"
-            return report, 0, 0
+            lines.append("✅ No issues detected - Great job!\n")
+            return ''.join(lines), 0, 0
         
         # Risk assessment
         risk_score = self._calculate_file_risk(issues)
         risk_level = self._get_risk_level(risk_score)
         
-        report += f"🎯 Issues Found: {file_issues}\n"
-        report += f"⚠️  Risk Level: {risk_level}\n\n"
+        lines.append(f"🎯 Issues Found: {file_issues}\n")
+        lines.append(f"⚠️  Risk Level: {risk_level}\n\n")
         
         # Issues by category
         for category, items in issues.items():
             if items:
+                count = len(items)
                 icon = self._get_category_icon(category)
-                report += f"{icon} {category.upper()} ({len(items)} issues):\n"
-                for i, item in enumerate(items[:5], 1):  # Limit to first 5
-                    report += f"  {i}. {item}\n"
-                if len(items) > 5:
-                    report += f"  ... and {len(items) - 5} more {category} issues\n"
-                report += "\n"
-        
-        return report, file_issues, risk_score
+                lines.append(f"{icon} {category.upper()} ({count} issues):\n")
+                lines.extend(f"  {i}. {item}\n" for i, item in enumerate(islice(items, 5), 1))  # Limit to first 5
+                if count > 5:
+                    lines.append(f"  ... and {count - 5} more {category} issues\n")
+                lines.append("\n")
+        
+        return ''.join(lines), file_issues, risk_score
     
     def _generate_summary(self, all_issues, total_issues, risk_score, file_count):
         """Generate overall summary and scoring with improved calculation."""
         # Improved weighted score calculation
         base_score = 100
-        total_penalty = 0
-        
-        for category, weight in self.scoring_weights.items():
-            issue_count = len(all_issues.get(category, []))
-            if issue_count > 0:
-                # Progressive penalty - first few issues have less impact
-                if issue_count <= 3:
-                    penalty = issue_count * weight * 0.5  # 50% penalty for first 3
-                elif issue_count <= 7:
-                    penalty = (3 * weight * 0.5) + ((issue_count - 3) * weight * 0.8)  # 80% for next 4
-                else:
-                    penalty = (3 * weight * 0.5) + (4 * weight * 0.8) + ((issue_count - 7) * weight)  # Full penalty for rest
-                
-                total_penalty += min(penalty, 40)  # Cap per category at 40 points
+        
+        total_penalty = sum(_progressive_penalty(len(all_issues.get(category, [])), weight)
+                            for category, weight in self.scoring_weights.items())
         
         weighted_score = max(5, base_score - total_penalty)  # Minimum score of 5
         
@@ -120,7 +155,7 @@ class FeedbackGeneration:
         avg_risk = risk_score / max(file_count, 1)
         overall_risk = self._get_risk_level(avg_risk)
         
-        summary = f"""
+        lines = [f"""
 🎯 OVERALL ASSESSMENT
 {'='*30}
 📊 Total Issues: {total_issues}
@@ -129,65 +164,46 @@ class FeedbackGeneration:
 📁 Files Affected: {file_count}
 
 🔢 ISSUE BREAKDOWN:
-"""
+"""]
         
         for category in ['security', 'bugs', 'complexity', 'structure', 'standards', 'performance']:
             count = len(all_issues.get(category, []))
             if count > 0:
                 icon = self._get_category_icon(category)
-                summary += f"{icon} {category.title()}: {count}\n"
+                lines.append(f"{icon} {category.title()}: {count}\n")
         
-        return summary
+        return ''.join(lines)
     
     def _generate_smart_recommendations(self, all_issues):
         """Generate prioritized, actionable recommendations."""
-        recommendations = "\n🚀 SMART RECOMMENDATIONS:\n"
-        recommendations += "=" * 30 + "\n"
-        
         priority_suggestions = self._get_priority_suggestions(all_issues)
         
         if not priority_suggestions:
-            recommendations += "✅ No specific recommendations - code looks good!\n"
-            return recommendations
-        
-        # Group recommendations by priority
-        high_priority = []
-        medium_priority = []
-        low_priority = []
-        
-        for suggestion in priority_suggestions:
-            if any(word in suggestion.lower() for word in ['security', 'critical', 'error']):
-                high_priority.append(suggestion)
-            elif any(word in suggestion.lower() for word in ['unused', 'unreachable', 'complexity']):
-                medium_priority.append(suggestion)
-            else:
-                low_priority.append(suggestion)
+            return _RECOMMENDATIONS_HEADER + "✅ No specific recommendations - code looks good!\n"
         
-        # Add recommendations by priority
-        if high_priority:
-            recommendations += "\n🔴 HIGH PRIORITY:\n"
-            for i, suggestion in enumerate(high_priority, 1):
-                recommendations += f"{i}. {suggestion}\n"
+        lines = [_RECOMMENDATIONS_HEADER]
         
-        if medium_priority:
-            recommendations += "\n🟡 MEDIUM PRIORITY:\n"
-            for i, suggestion in enumerate(medium_priority, 1):
-                recommendations += f"{i}. {suggestion}\n"
+        # Group recommendations by the priority tagged at creation
+        buckets = {'high': [], 'medium': [], 'low': []}
+        for priority, suggestion in priority_suggestions:
+            buckets[priority].append(suggestion)
         
-        if low_priority:
-            recommendations += "\n🟢 LOW PRIORITY:\n"
-            for i, suggestion in enumerate(low_priority, 1):
-                recommendations += f"{i}. {suggestion}\n"
+        # Add recommendations by priority
+        for priority, heading in (('high', '🔴 HIGH PRIORITY'),
+                                  ('medium', '🟡 MEDIUM PRIORITY'),
+                                  ('low', '🟢 LOW PRIORITY')):
+            if buckets[priority]:
+                lines.append(f"\n{heading}:\n")
+                lines.extend(f"{i}. {suggestion}\n" for i, suggestion in enumerate(buckets[priority], 1))
         
         # Add learning resources
-        recommendations += self._get_learning_resources(all_issues)
+        lines.append(self._get_learning_resources(all_issues))
         
-        return recommendations
+        return ''.join(lines)
     
     def _generate_inline_comments_section(self, analysis_results):
         """Generate enhanced inline comments section."""
-        section = "\n💬 INLINE REVIEW COMMENTS:\n"
-        section += "=" * 30 + "\n"
+        lines = [_INLINE_COMMENTS_HEADER]
         
         has_comments = False
         comment_count = 0
@@ -206,24 +222,24 @@ class FeedbackGeneration:
             
             if file_comments:
                 has_comments = True
-                section += f"\n📄 {filename}:\n"
+                lines.append(f"\n📄 {filename}:\n")
                 
-                for comment in file_comments[:8]:  # Limit to 8 per file
-                    section += f"  💡 **{comment['category'].upper()}**: {comment['suggestion']}\n"
+                for comment in islice(file_comments, 8):  # Limit to 8 per file
+                    lines.append(f"  💡 **{comment['category'].upper()}**: {comment['suggestion']}\n")
                     if comment.get('example'):
-                        section += f"     📝 Example: {comment['example']}\n"
-                    section += "\n"
+                        lines.append(f"     📝 Example: {comment['example']}\n")
+                    lines.append("\n")
                     comment_count += 1
                 
                 if len(file_comments) > 8:
-                    section += f"     ... and {len(file_comments) - 8} more suggestions\n\n"
+                    lines.append(f"     ... and {len(file_comments) - 8} more suggestions\n\n")
         
         if not has_comments:
-            section += "ℹ️  No line-specific comments generated.\n"
+            lines.append("ℹ️  No line-specific comments generated.\n")
         else:
-            section += f"📊 Generated {comment_count} actionable suggestions\n"
+            lines.append(f"📊 Generated {comment_count} actionable suggestions\n")
         
-        return section
+        return ''.join(lines)
     
     def _create_inline_comment(self, issue, category, filename):
         """Create actionable inline comment from issue."""
@@ -298,14 +314,7 @@ class FeedbackGeneration:
     
     def _get_risk_level(self, score):
         """Get risk level based on score."""
-        if score >= 80:
-            return "🔴 HIGH"
-        elif score >= 40:
-            return "🟡 MEDIUM"
-        elif score >= 15:
-            return "🟢 LOW"
-        else:
-            return "✅ MINIMAL"
+        return _RISK_LABELS[bisect.bisect_right(_RISK_BOUNDS, score)]
     
     def _get_category_icon(self, category):
         """Get icon for issue category."""
@@ -320,66 +329,66 @@ class FeedbackGeneration:
         return icons.get(category, '📝')
     
     def _get_priority_suggestions(self, all_issues):
-        """Get prioritized suggestions based on issues found - FIXED VERSION."""
+        """Get (priority, suggestion) tuples based on issues found - FIXED VERSION."""
         suggestions = []
         
         # Security first (critical)
         if all_issues.get('security'):
-            suggestions.append("🔒 **CRITICAL**: Fix security vulnerabilities immediately")
+            suggestions.append(('high', "🔒 **CRITICAL**: Fix security vulnerabilities immediately"))
         
         # Critical bugs
         bugs = all_issues.get('bugs', [])
         if bugs:
             # Check for specific types of bugs
             if any('unreachable' in str(bug).lower() for bug in bugs):
-                suggestions.append("🐛 Remove unreachable code that will never execute")
+                suggestions.append(('medium', "🐛 Remove unreachable code that will never execute"))
             if any('unused' in str(bug).lower() for bug in bugs):
-                suggestions.append("🐛 Clean up unused variables to improve code clarity")
+                suggestions.append(('medium', "🐛 Clean up unused variables to improve code clarity"))
             if any('constant' in str(bug).lower() for bug in bugs):
-                suggestions.append("🐛 Fix conditional statements with constant values")
+                suggestions.append(('low', "🐛 Fix conditional statements with constant values"))
         
         # Standards issues
         standards = all_issues.get('standards', [])
         if standards:
             if any('docstring' in str(std).lower() for std in standards):
-                suggestions.append("📏 Add docstrings to improve code documentation")
+                suggestions.append(('low', "📏 Add docstrings to improve code documentation"))
             if any('whitespace' in str(std).lower() for std in standards):
-                suggestions.append("📏 Fix spacing and formatting issues (PEP 8)")
+                suggestions.append(('low', "📏 Fix spacing and formatting issues (PEP 8)"))
         
         # Structure issues  
         if all_issues.get('structure'):
-            suggestions.append("🏗️ Improve code structure and class design")
+            suggestions.append(('low', "🏗️ Improve code structure and class design"))
         
         # Complexity
         if all_issues.get('complexity'):
-            suggestions.append("🔄 Refactor complex functions to improve maintainability")
+            suggestions.append(('low', "🔄 Refactor complex functions to improve maintainability"))
         
         return suggestions
     
     def _get_learning_resources(self, all_issues):
         """Provide learning resources based on issues."""
-        resources = "\n📚 LEARNING RESOURCES:\n"
+        lines = ["\n📚 LEARNING RESOURCES:\n"]
         
         has_resources = False
         if all_issues.get('security'):
-            resources += "• Security Best Practices: https://owasp.org/www-project-top-ten/\n"
+            lines.append("• Security Best Practices: https://owasp.org/www-project-top-ten/\n")
             has_resources = True
         
         if all_issues.get('standards'):
-            resources += "• Python Style Guide (PEP 8): https://pep8.org/\n"
+            lines.append("• Python Style Guide (PEP 8): https://pep8.org/\n")
             has_resources = True
         
         if all_issues.get('complexity') or all_issues.get('structure'):
-            resources += "• Clean Code Principles: https://refactoring.guru/\n"
+            lines.append("• Clean Code Principles: https://refactoring.guru/\n")
             has_resources = True
         
         # Fixed this line - convert to string first before checking
         standards_str = str(all_issues.get('standards', []))
         if 'docstring' in standards_str.lower():
-            resources += "• Python Docstring Guide: https://peps.python.org/pep-0257/\n"
+            lines.append("• Python Docstring Guide: https://peps.python.org/pep-0257/\n")
             has_resources = True
         
         if not has_resources:
-            resources += "• General Python Best Practices: https://docs.python-guide.org/\n"
+            lines.append("• General Python Best Practices: https://docs.python-guide.org/\n")
         
-        return resources
+        return ''.join(lines)
@@ -1,38 +1,254 @@
+import asyncio
+import hashlib
+import json
 import os
+import threading
+import time
 from github import Github
 from github import GithubException
-import gitlab
 from dotenv import load_dotenv
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 import base64
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 load_dotenv()
 
+# python-gitlab is slow to import, so it is loaded only when a GitLab client is created
+gitlab = None
+
+# Credentials and endpoints, read once at import
+_GITHUB_TOKENS = [t.strip() for t in (os.getenv('GITHUB_TOKENS') or os.getenv('GITHUB_TOKEN', '')).split(',') if t.strip()]
+_GITLAB_TOKEN = os.getenv('GITLAB_TOKEN')
+_GITLAB_URL = os.getenv('GITLAB_URL', 'https://gitlab.com')
+_BITBUCKET_USERNAME = os.getenv('BITBUCKET_USERNAME')
+_BITBUCKET_API_TOKEN = os.getenv('BITBUCKET_API_TOKEN')
+_BITBUCKET_WORKSPACE = os.getenv('BITBUCKET_WORKSPACE')
+
+# Concurrent per-file content fetches; these calls are network-bound
+MAX_FETCH_WORKERS = 8
+# Keep-alive connections held open per host
+HTTP_POOL_SIZE = 16
+GITHUB_API_URL = 'https://api.github.com'
+GITHUB_GRAPHQL_URL = f'{GITHUB_API_URL}/graphql'
+# Aliased blob lookups per GraphQL query
+GRAPHQL_BATCH_SIZE = 100
+# Pause GitHub calls until reset once fewer core requests than this remain
+RATE_LIMIT_THRESHOLD = 100
+# Larger files are skipped as generated or vendored code
+MAX_CONTENT_BYTES = 1000000
+# File extensions whose contents are fetched for analysis
+ANALYZABLE_EXTENSIONS = ('.py',)
+# On-disk cache of file contents keyed by (repo, commit sha, path)
+BLOB_CACHE_DIR = os.getenv('PR_AGENT_CACHE_DIR', os.path.expanduser('~/.cache/pr-agent/blobs'))
+# Oldest cached blobs are evicted once the cache grows past this many bytes
+BLOB_CACHE_MAX_BYTES = int(os.getenv('PR_AGENT_CACHE_MAX_BYTES', str(2 ** 30)))
+# Cached blobs older than this (seconds) are deleted
+BLOB_CACHE_MAX_AGE = 30 * 24 * 60 * 60
+# Minimum seconds between cache prunes in one process; each prune scans the cache directory
+BLOB_CACHE_PRUNE_INTERVAL = 60
+
+_last_blob_prune = 0.0
+_blob_prune_lock = threading.Lock()
+
+# (token, client) pairs rotated round-robin to spread GitHub rate limits. Shared by every
+# GitIntegration, so the rotation and each client's pool outlive per-batch instances.
+_github_clients = deque()
+# Tokens whose client has been handed out, so PyGithub holds their X-RateLimit-* values
+_github_tokens_used = set()
+_github_clients_lock = threading.Lock()
+
+
+def _lazy_gitlab():
+    """Import python-gitlab on first use and bind it to the module global."""
+    global gitlab
+    if gitlab is None:
+        import gitlab as _gitlab
+        gitlab = _gitlab
+    return gitlab
+
+
+def _prune_blob_cache():
+    """Delete expired cached blobs, then the oldest until the cache fits BLOB_CACHE_MAX_BYTES."""
+    global _last_blob_prune
+    now = time.time()
+    with _blob_prune_lock:
+        if now - _last_blob_prune < BLOB_CACHE_PRUNE_INTERVAL:
+            return
+        _last_blob_prune = now
+    
+    entries = []
+    total_bytes = 0
+    try:
+        with os.scandir(BLOB_CACHE_DIR) as scan:
+            for entry in scan:
+                try:
+                    stat = entry.stat()
+                    if now - stat.st_mtime > BLOB_CACHE_MAX_AGE:
+                        os.remove(entry.path)
+                    elif not entry.name.endswith('.tmp'):  # Leave in-progress writes alone
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+                        total_bytes += stat.st_size
+                except OSError:
+                    continue  # Removed concurrently by another worker
+    except OSError:
+        return
+    
+    if total_bytes <= BLOB_CACHE_MAX_BYTES:
+        return
+    entries.sort()
+    for _, size, path in entries:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+        total_bytes -= size
+        if total_bytes <= BLOB_CACHE_MAX_BYTES:
+            break
+
+
+def _get_github_clients():
+    """Create the shared GitHub clients on first use."""
+    with _github_clients_lock:
+        if not _github_clients:
+            # Shared keep-alive connection pool so per-file requests reuse one TLS session
+            _github_clients.extend(
+                (token, Github(token, per_page=100, pool_size=HTTP_POOL_SIZE)) for token in _GITHUB_TOKENS
+            )
+    return _github_clients
+
+
+def create_http_session():
+    """Build a keep-alive requests session with a pooled, retrying HTTPS adapter."""
+    session = requests.Session()
+    adapter = HTTPAdapter(
+        pool_connections=HTTP_POOL_SIZE,
+        pool_maxsize=2 * HTTP_POOL_SIZE,
+        max_retries=Retry(total=3, backoff_factor=0.5, status_forcelist=[502, 503, 504])
+    )
+    session.mount('https://', adapter)
+    return session
+
+
+# Demo Bitbucket PR - same test file content as GitHub/GitLab for consistent analysis
+_BITBUCKET_DEMO_CONTENT = {
+    'bad_code.py': '''def add(a,b): # PEP 8 violation
+    temp = a + b
+    return a + b
+    unused_var = 42  # Unused
+
+
+def subtract(a, b):
+    result = a - b
+    return result
+    unreachable = "This is unreachable code"  # Unreachable code
+
+
+unused_func = lambda x: x * 2  # Unused lambda
+
+
+if True:
+    print("Test")
+else:
+    print("Unreachable else")  # Unreachable else
+
+
+class BadClass:
+    def __init__(self):
+        self.var = 10
+
+
+    def bad_method(self):
+        self.var = 20
+        del self.var  # Potential issue
+''',
+    'good_code.py': '''class Calculator:
+    """A simple calculator class."""
+    def add(self, a, b):
+        """Adds two numbers."""
+        return a + b
+
+
+    def subtract(self, a, b):
+        """Subtracts b from a."""
+        return a - b
+
+
+    def multiply(self, a, b):
+        """Multiplies two numbers."""
+        return a * b
+
+
+    def divide(self, a, b):
+        """Divides a by b, with error handling."""
+        if b == 0:
+            raise ValueError("Division by zero is not allowed.")
+        return a / b
+'''
+}
+
+_BITBUCKET_DEMO_FILES = tuple(
+    {
+        'filename': filename,
+        'patch': f'diff --git a/{filename} b/{filename}\n@@ -0,0 +1,{len(content.split())} @@\n+{content[:100]}...',
+        'content': content,
+        'additions': sum(1 for line in content.split('\n') if line.strip()),
+        'deletions': 0,
+        'status': 'modified',
+        'sha': 'abc12345'
+    }
+    for filename, content in _BITBUCKET_DEMO_CONTENT.items()
+)
+
+
 class GitIntegration:
     """Enhanced Git integration supporting GitHub, GitLab, and Bitbucket."""
     
-    def __init__(self, server_type='github'):
+    # Per-platform handler method names
+    _FETCHERS = {
+        'github': '_fetch_github_pr',
+        'gitlab': '_fetch_gitlab_mr',
+        'bitbucket': '_fetch_bitbucket_pr'
+    }
+    _COMMENTERS = {
+        'github': '_post_github_comment',
+        'gitlab': '_post_gitlab_comment',
+        'bitbucket': '_post_bitbucket_comment'
+    }
+    
+    def __init__(self, server_type='github', session=None):
         self.server_type = server_type.lower()
+        # Long-running callers pass one shared session so connections outlive each instance
+        self._http = session or create_http_session()
+        # Repository/project and PR/MR handles, reused between fetch and comment calls
+        # (GitHub handles are keyed by token too, since each is bound to its client)
+        self._repo_cache = {}
+        self._pr_cache = {}
+        # GitHub (token, client) pair this instance's calls go through, chosen by _rl_guard
+        self._github_active = None
         
         if self.server_type == 'github':
-            token = os.getenv('GITHUB_TOKEN')
-            if not token:
+            tokens = _GITHUB_TOKENS
+            if not tokens:
                 raise ValueError("GITHUB_TOKEN not found in .env")
-            self.client = Github(token)
-            print("✅ GitHub client initialized.")
+            self._github_active = _get_github_clients()[0]
+            self._client = None
+            print(f"✅ GitHub client initialized ({len(tokens)} token(s)).")
             
         elif self.server_type == 'gitlab':
-            token = os.getenv('GITLAB_TOKEN')
-            gitlab_url = os.getenv('GITLAB_URL', 'https://gitlab.com')
+            token = _GITLAB_TOKEN
+            gitlab_url = _GITLAB_URL
             if not token:
                 raise ValueError("GITLAB_TOKEN not found in .env")
-            self.client = gitlab.Gitlab(gitlab_url, private_token=token)
+            self._client = _lazy_gitlab().Gitlab(gitlab_url, private_token=token, session=self._http)
             print("✅ GitLab client initialized.")
             
         elif self.server_type == 'bitbucket':
-            username = os.getenv('BITBUCKET_USERNAME')
-            api_token = os.getenv('BITBUCKET_API_TOKEN')
-            workspace = os.getenv('BITBUCKET_WORKSPACE')
+            username = _BITBUCKET_USERNAME
+            api_token = _BITBUCKET_API_TOKEN
+            workspace = _BITBUCKET_WORKSPACE
             
             if not username or not api_token or not workspace:
                 raise ValueError("BITBUCKET_USERNAME, BITBUCKET_API_TOKEN, and BITBUCKET_WORKSPACE are required in .env")
@@ -41,7 +257,7 @@ class GitIntegration:
             self.username = username.strip()
             self.api_token = api_token.strip()
             self.workspace = workspace.strip()
-            self.client = None  # We'll use requests directly
+            self._client = None  # We'll use requests directly via self._http
             
             print(f"✅ Bitbucket client initialized.")
             print(f"🔍 Username: '{self.username}' (length: {len(self.username)})")
@@ -50,21 +266,86 @@ class GitIntegration:
         else:
             raise ValueError(f"Unsupported server: {server_type}")
 
-    def fetch_pr(self, repo_name, pr_number):
-        """Fetch PR data from configured git server."""
-        if self.server_type == 'github':
-            return self._fetch_github_pr(repo_name, pr_number)
-        elif self.server_type == 'gitlab':
-            return self._fetch_gitlab_mr(repo_name, pr_number)
-        elif self.server_type == 'bitbucket':
-            return self._fetch_bitbucket_pr(repo_name, pr_number)
-        else:
+    def fetch_pr(self, repo_name, pr_number, filter_extensions=ANALYZABLE_EXTENSIONS):
+        """Fetch PR data from configured git server, downloading only files with the given extensions."""
+        fetcher = self._FETCHERS.get(self.server_type)
+        if fetcher is None:
             raise NotImplementedError(f"PR fetching not implemented for {self.server_type}")
+        return getattr(self, fetcher)(repo_name, pr_number, filter_extensions)
 
-    def _is_analyzable_file(self, filename):
+    async def fetch_pr_async(self, repo_name, pr_number, filter_extensions=ANALYZABLE_EXTENSIONS):
+        """Fetch PR data without blocking the event loop (for async callers)."""
+        return await asyncio.to_thread(self.fetch_pr, repo_name, pr_number, filter_extensions)
+
+    @property
+    def client(self):
+        """Active API client; for GitHub, the one _rl_guard last chose."""
+        if self._github_active is not None:
+            return self._github_active[1]
+        return self._client
+
+    def _rl_guard(self):
+        """Switch to the next GitHub token with quota left, or wait for the earliest reset.
+        
+        Every request of the operation that follows (PyGithub handles, GraphQL and REST
+        blob fetches) goes through the chosen token.
+        """
+        with _github_clients_lock:
+            # PyGithub tracks these from the X-RateLimit-* headers of the last response
+            for _ in range(len(_github_clients)):
+                _github_clients.rotate(-1)
+                token, client = _github_clients[0]
+                # An unused client has no header values yet and reading them would cost a
+                # GET /rate_limit, so its first request goes ahead and supplies them
+                if token not in _github_tokens_used:
+                    _github_tokens_used.add(token)
+                    self._github_active = _github_clients[0]
+                    return
+                remaining, _ = client.rate_limiting
+                if remaining >= RATE_LIMIT_THRESHOLD:
+                    self._github_active = _github_clients[0]
+                    return
+            self._github_active = min(_github_clients, key=lambda pair: pair[1].rate_limiting_resettime)
+        
+        wait = max(0, self._github_active[1].rate_limiting_resettime - time.time()) + 1
+        print(f"⏳ GitHub rate limit low on all tokens - waiting {int(wait)}s for reset")
+        time.sleep(wait)
+
+    def _get_github_repo(self, repo_name):
+        """Get a GitHub repository handle through the active token, cached per (token, repository)."""
+        key = (self._github_active[0], repo_name)
+        repo = self._repo_cache.get(key)
+        if repo is None:
+            repo = self._repo_cache.setdefault(key, self.client.get_repo(repo_name))
+        return repo
+
+    def _get_github_pull(self, repo_name, pr_number):
+        """Get a GitHub pull request handle through the active token, cached per (token, repository, PR)."""
+        key = (self._github_active[0], repo_name, pr_number)
+        pr = self._pr_cache.get(key)
+        if pr is None:
+            pr = self._pr_cache.setdefault(key, self._get_github_repo(repo_name).get_pull(pr_number))
+        return pr
+
+    def _get_gitlab_project(self, project_path):
+        """Get a GitLab project handle, cached per project."""
+        project = self._repo_cache.get(project_path)
+        if project is None:
+            project = self._repo_cache.setdefault(project_path, self.client.projects.get(project_path))
+        return project
+
+    def _get_gitlab_mr(self, project_path, mr_number):
+        """Get a GitLab merge request handle, cached per (project, MR)."""
+        key = (project_path, mr_number)
+        mr = self._pr_cache.get(key)
+        if mr is None:
+            mr = self._pr_cache.setdefault(key, self._get_gitlab_project(project_path).mergerequests.get(mr_number))
+        return mr
+
+    def _is_analyzable_file(self, filename, extensions=ANALYZABLE_EXTENSIONS):
         """Check if file should be analyzed."""
-        # Only analyze Python files, skip workflow files and other non-Python files
-        if not filename.endswith('.py'):
+        # Only analyze source files of the requested types, skip workflow files and everything else
+        if not filename.endswith(tuple(extensions)):
             return False
         if filename.startswith('.github/'):
             return False
@@ -84,73 +365,122 @@ class GitIntegration:
             else:
                 return ''
             
-            # Handle bytes
-            if isinstance(raw_content, bytes):
-                # Try UTF-8 first
-                try:
-                    content = raw_content.decode('utf-8')
-                except UnicodeDecodeError:
-                    try:
-                        # Try latin-1 as fallback
-                        content = raw_content.decode('latin-1')
-                    except UnicodeDecodeError:
-                        print(f"   ⚠️  Could not decode {filename} - skipping")
-                        return ''
-            else:
-                content = str(raw_content)
-            
-            # Check for null bytes or other binary indicators
-            if '\x00' in content or len(content.encode('utf-8')) > 1000000:  # Skip very large files
-                print(f"   ⚠️  {filename} appears to be binary or too large - skipping")
-                return ''
-                
-            return content
+            return self._decode_raw_content(raw_content, filename)
             
         except Exception as e:
             print(f"   ⚠️  Error decoding {filename}: {str(e)}")
             return ''
 
-    def _fetch_github_pr(self, repo_name, pr_number):
+    def _decode_raw_content(self, raw_content, filename):
+        """Decode raw file bytes to text, returning '' for binary or oversized files."""
+        # Handle bytes
+        if isinstance(raw_content, bytes):
+            # Check for null bytes or very large files on the raw bytes, before
+            # decoding, so the text is never re-encoded just to measure it
+            if b'\x00' in raw_content or len(raw_content) > MAX_CONTENT_BYTES:
+                print(f"   ⚠️  {filename} appears to be binary or too large - skipping")
+                return ''
+            # Try UTF-8 first
+            try:
+                return raw_content.decode('utf-8')
+            except UnicodeDecodeError:
+                try:
+                    # Try latin-1 as fallback
+                    return raw_content.decode('latin-1')
+                except UnicodeDecodeError:
+                    print(f"   ⚠️  Could not decode {filename} - skipping")
+                    return ''
+        
+        content = str(raw_content)
+        
+        # Check for null bytes or other binary indicators
+        if '\x00' in content or len(content.encode('utf-8')) > MAX_CONTENT_BYTES:  # Skip very large files
+            print(f"   ⚠️  {filename} appears to be binary or too large - skipping")
+            return ''
+            
+        return content
+
+    def _fetch_github_pr(self, repo_name, pr_number, filter_extensions=ANALYZABLE_EXTENSIONS):
         """Fetch GitHub PR data."""
         try:
+            self._rl_guard()
             print(f"🔗 Connecting to GitHub repo {repo_name}...")
-            repo = self.client.get_repo(repo_name)
-            pr = repo.get_pull(pr_number)
+            repo = self._get_github_repo(repo_name)
+            pr = self._get_github_pull(repo_name, pr_number)
             print(f"📝 PR #{pr_number}: {pr.title}")
             print(f"👤 Author: {pr.user.login}")
             print(f"🌿 Base: {pr.base.ref} ← Head: {pr.head.ref}")
             
-            files = list(pr.get_files())
-            print(f"📁 Found {len(files)} files in PR")
-            
-            pr_data = []
-            for file in files:
+            # Consume the paginated file list lazily, keeping only analyzable files
+            analyzable_files = []
+            file_count = 0
+            for file in pr.get_files():
+                file_count += 1
                 # Only process Python files
-                if not self._is_analyzable_file(file.filename):
-                    print(f"   ⏩ Skipping {file.filename} (not a Python source file)")
+                if not self._is_analyzable_file(file.filename, filter_extensions):
+                    print(f"   ⏩ Skipping {file.filename} (not an analyzable source file)")
                     continue
-                
+                # Removed files no longer exist at the head commit - don't fetch them
+                if file.status == 'removed':
+                    print(f"   ⏩ Skipping {file.filename} (removed in this PR)")
+                    continue
+                analyzable_files.append(file)
+            print(f"📁 Found {file_count} files in PR")
+            
+            # Blobs at the head commit are immutable, so reuse any cached on disk
+            head_sha = pr.head.sha
+            blobs = {}
+            for file in analyzable_files:
+                cached = self._read_cached_blob(repo_name, head_sha, file.filename)
+                if cached is not None:
+                    blobs[file.filename] = cached
+            uncached = [f.filename for f in analyzable_files if f.filename not in blobs]
+            
+            # Fetch the rest in batched GraphQL queries, falling back to
+            # concurrent REST fetches for anything GraphQL did not return
+            fetched = {}
+            if uncached:
                 try:
-                    content_obj = repo.get_contents(file.filename, ref=pr.head.sha)
-                    content = self._safe_decode_content(content_obj, file.filename)
-                    
-                    if content:  # Only add files with valid content
-                        pr_data.append({
-                            'filename': file.filename,
-                            'patch': file.patch or '',
-                            'content': content,
-                            'additions': file.additions,
-                            'deletions': file.deletions,
-                            'status': file.status,
-                            'sha': file.sha
-                        })
-                        print(f"   📄 {file.filename} (+{file.additions}/-{file.deletions}) - {len(content)} chars")
-                    else:
-                        print(f"   ⏩ Skipping {file.filename} - no valid content")
-                        
+                    fetched = self._fetch_github_blobs_graphql(repo_name, head_sha, uncached)
                 except Exception as e:
-                    print(f"   ⚠️  Could not fetch content for {file.filename}: {str(e)}")
-                    continue
+                    print(f"   ⚠️  GraphQL batch fetch failed, falling back to REST: {str(e)}")
+            
+            # blobs still holds only the disk hits here, so dict lookups stand in for uncached
+            missing = [f for f in analyzable_files if f.filename not in blobs and f.filename not in fetched]
+            with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+                fetched.update(zip((f.filename for f in missing), executor.map(
+                    lambda f: self._get_github_file_content(repo, f.filename, head_sha, blob_sha=f.sha),
+                    missing
+                )))
+            
+            for filename, content in fetched.items():
+                if content:
+                    self._write_cached_blob(repo_name, head_sha, filename, content)
+            blobs.update(fetched)
+            contents = [blobs[f.filename] for f in analyzable_files]
+            
+            pr_data = []
+            for file, content in zip(analyzable_files, contents):
+                if content is None:
+                    continue  # Fetch failed, already reported
+                
+                # Bind PyGithub attributes once - each access goes through its lazy loader
+                filename = file.filename
+                if content:  # Only add files with valid content
+                    additions = file.additions
+                    deletions = file.deletions
+                    pr_data.append({
+                        'filename': filename,
+                        'patch': file.patch or '',
+                        'content': content,
+                        'additions': additions,
+                        'deletions': deletions,
+                        'status': file.status,
+                        'sha': file.sha
+                    })
+                    print(f"   📄 {filename} (+{additions}/-{deletions}) - {len(content)} chars")
+                else:
+                    print(f"   ⏩ Skipping {filename} - no valid content")
                     
             print(f"✅ Successfully processed {len(pr_data)} Python files from GitHub PR")
             return pr_data
@@ -158,24 +488,127 @@ class GitIntegration:
         except GithubException as e:
             raise ValueError(f"GitHub API error for PR {pr_number} in {repo_name}: {str(e)}")
 
-    def _fetch_gitlab_mr(self, project_path, mr_number):
+    def _fetch_github_blobs_graphql(self, repo_name, ref, filenames):
+        """Fetch file texts at a ref via batched GraphQL queries; returns {filename: content}."""
+        owner, name = repo_name.split('/', 1)
+        blobs = {}
+        
+        for start in range(0, len(filenames), GRAPHQL_BATCH_SIZE):
+            batch = filenames[start:start + GRAPHQL_BATCH_SIZE]
+            fields = ' '.join(
+                f'file{i}: object(expression: {json.dumps(f"{ref}:{filename}")}) '
+                '{ ... on Blob { text isBinary byteSize isTruncated } }'
+                for i, filename in enumerate(batch)
+            )
+            query = (
+                'query($owner: String!, $name: String!) '
+                f'{{ repository(owner: $owner, name: $name) {{ {fields} }} }}'
+            )
+            response = self._http.post(
+                GITHUB_GRAPHQL_URL,
+                json={'query': query, 'variables': {'owner': owner, 'name': name}},
+                headers={'Authorization': f'bearer {self._github_active[0]}'},
+                timeout=30
+            )
+            response.raise_for_status()
+            payload = response.json()
+            if payload.get('errors'):
+                raise ValueError(payload['errors'][0].get('message', 'GraphQL error'))
+            
+            repository = (payload.get('data') or {}).get('repository') or {}
+            for i, filename in enumerate(batch):
+                blob = repository.get(f'file{i}')
+                if not blob:
+                    continue  # Not returned - leave for the REST fallback
+                # Same size guard as the REST path, applied before the text is used
+                if blob.get('isBinary') or (blob.get('byteSize') or 0) > MAX_CONTENT_BYTES:
+                    print(f"   ⚠️  {filename} appears to be binary or too large - skipping")
+                    blobs[filename] = ''
+                elif blob.get('isTruncated'):
+                    continue  # Partial text - leave for the REST fallback
+                elif blob.get('text') is not None:
+                    blobs[filename] = blob['text']
+        
+        print(f"   📦 Fetched {len(blobs)} file(s) via GraphQL")
+        return blobs
+
+    def _blob_cache_path(self, repo_name, sha, path):
+        """Location of a cached blob for (repo, sha, path)."""
+        key = hashlib.sha256(f'{repo_name}|{sha}|{path}'.encode('utf-8')).hexdigest()
+        return os.path.join(BLOB_CACHE_DIR, key)
+
+    def _read_cached_blob(self, repo_name, sha, path):
+        """Return cached file content, or None on a cache miss."""
+        if not sha:
+            return None
+        try:
+            with open(self._blob_cache_path(repo_name, sha, path), encoding='utf-8', newline='') as f:
+                return f.read()
+        except (OSError, UnicodeDecodeError):
+            return None
+
+    def _write_cached_blob(self, repo_name, sha, path, content):
+        """Store file content in the on-disk cache; failures are non-fatal."""
+        if not sha:
+            return
+        cache_path = self._blob_cache_path(repo_name, sha, path)
+        temp_path = f"{cache_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            # Private repository source: readable by the current user only
+            os.makedirs(BLOB_CACHE_DIR, mode=0o700, exist_ok=True)
+            fd = os.open(temp_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+            with open(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            os.replace(temp_path, cache_path)  # Atomic, safe across worker threads
+        except OSError as e:
+            print(f"   ⚠️  Could not cache {path}: {str(e)}")
+            return
+        _prune_blob_cache()
+
+    def _get_github_file_content(self, repo, filename, ref, blob_sha=None):
+        """Fetch and decode a single GitHub file, returning None if the request fails."""
+        try:
+            if blob_sha:
+                # The blob API skips path resolution and also serves files over 1 MB;
+                # the raw media type returns the bytes without base64 wrapping
+                response = self._http.get(
+                    f"{GITHUB_API_URL}/repos/{repo.full_name}/git/blobs/{blob_sha}",
+                    headers={
+                        'Authorization': f'token {self._github_active[0]}',
+                        'Accept': 'application/vnd.github.raw+json'
+                    },
+                    timeout=30
+                )
+                response.raise_for_status()
+                return self._decode_raw_content(response.content, filename)
+            
+            content_obj = repo.get_contents(filename, ref=ref)
+            return self._safe_decode_content(content_obj, filename)
+        except Exception as e:
+            print(f"   ⚠️  Could not fetch content for {filename}: {str(e)}")
+            return None
+
+    def _fetch_gitlab_mr(self, project_path, mr_number, filter_extensions=ANALYZABLE_EXTENSIONS):
         """Fetch GitLab Merge Request data."""
         try:
             print(f"🔗 Connecting to GitLab project {project_path}...")
             
             # Get project
-            project = self.client.projects.get(project_path)
+            project = self._get_gitlab_project(project_path)
             print(f"✅ Found project: {project.name}")
             
             # Get merge request
             print(f"🔍 Fetching MR #{mr_number}...")
-            mr = project.mergerequests.get(mr_number)
+            mr = self._get_gitlab_mr(project_path, mr_number)
             
-            # Access attributes safely
-            mr_title = getattr(mr, 'title', f'MR #{mr_number}')
-            mr_author = getattr(mr, 'author', {}).get('name', 'Unknown')
-            mr_target_branch = getattr(mr, 'target_branch', 'main')
-            mr_source_branch = getattr(mr, 'source_branch', 'unknown')
+            # Access attributes safely from the raw attribute dict
+            mr_attrs = mr.attributes
+            mr_title = mr_attrs.get('title', f'MR #{mr_number}')
+            mr_author = (mr_attrs.get('author') or {}).get('name', 'Unknown')
+            mr_target_branch = mr_attrs.get('target_branch', 'main')
+            mr_source_branch = mr_attrs.get('source_branch', 'unknown')
+            # Source head commit - pins fetched contents so they can be cached
+            mr_head_sha = mr_attrs.get('sha')
             
             print(f"📝 MR !{mr_number}: {mr_title}")
             print(f"👤 Author: {mr_author}")
@@ -192,57 +625,69 @@ class GitIntegration:
                 diffs = comparison.get('diffs', [])
                 print(f"📁 Found {len(diffs)} files via comparison")
                 
+                analyzable_diffs = []
                 for diff in diffs:
                     if isinstance(diff, dict):
                         file_path = diff.get('new_path') or diff.get('old_path')
-                        if file_path and self._is_analyzable_file(file_path):
+                        if diff.get('deleted_file'):
+                            print(f"   ⏩ Skipping {file_path} (removed in this MR)")
+                            continue
+                        if file_path and self._is_analyzable_file(file_path, filter_extensions):
                             print(f"   📄 Processing {file_path}...")
-                            content = self._get_gitlab_file_content(project, file_path, mr_source_branch)
-                            
-                            if content:
-                                additions = len([l for l in diff.get('diff', '').split('\n') if l.startswith('+') and not l.startswith('+++')])
-                                deletions = len([l for l in diff.get('diff', '').split('\n') if l.startswith('-') and not l.startswith('---')])
-                                
-                                mr_data.append({
-                                    'filename': file_path,
-                                    'patch': diff.get('diff', ''),
-                                    'content': content,
-                                    'additions': additions,
-                                    'deletions': deletions,
-                                    'status': 'modified',
-                                    'sha': diff.get('b_mode', '')
-                                })
-                                print(f"   ✅ {file_path} (content: {len(content)} chars)")
+                            analyzable_diffs.append((file_path, diff))
+                
+                with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+                    contents = list(executor.map(
+                        lambda item: self._get_gitlab_file_content(project, item[0], mr_source_branch, mr_head_sha),
+                        analyzable_diffs
+                    ))
+                
+                for (file_path, diff), content in zip(analyzable_diffs, contents):
+                    if content:
+                        additions, deletions = self._count_diff_changes(diff.get('diff', ''))
+                        
+                        mr_data.append({
+                            'filename': file_path,
+                            'patch': diff.get('diff', ''),
+                            'content': content,
+                            'additions': additions,
+                            'deletions': deletions,
+                            'status': 'modified',
+                            'sha': diff.get('b_mode', '')
+                        })
+                        print(f"   ✅ {file_path} (content: {len(content)} chars)")
                 
             except Exception as e:
                 print(f"⚠️  Comparison method failed: {str(e)}")
                 print(f"🔄 Trying direct file method...")
                 
                 # Method 2: Fallback - get known files directly
-                known_files = ['bad_code.py', 'good_code.py']
+                known_files = [path for path in ('bad_code.py', 'good_code.py')
+                               if self._is_analyzable_file(path, filter_extensions)]
                 
                 for file_path in known_files:
-                    try:
-                        print(f"   📄 Trying to get {file_path}...")
-                        content = self._get_gitlab_file_content(project, file_path, mr_source_branch)
-                        
-                        if content:  # Only add if we got content
-                            mr_data.append({
-                                'filename': file_path,
-                                'patch': '',
-                                'content': content,
-                                'additions': 0,
-                                'deletions': 0,
-                                'status': 'modified',
-                                'sha': ''
-                            })
-                            print(f"   ✅ {file_path} (content: {len(content)} chars)")
-                        else:
-                            print(f"   ⚠️  {file_path} not found or empty")
-                            
-                    except Exception as e:
-                        print(f"   ❌ Error getting {file_path}: {str(e)}")
-                        continue
+                    print(f"   📄 Trying to get {file_path}...")
+                
+                with ThreadPoolExecutor(max_workers=MAX_FETCH_WORKERS) as executor:
+                    contents = list(executor.map(
+                        lambda path: self._get_gitlab_file_content(project, path, mr_source_branch, mr_head_sha),
+                        known_files
+                    ))
+                
+                for file_path, content in zip(known_files, contents):
+                    if content:  # Only add if we got content
+                        mr_data.append({
+                            'filename': file_path,
+                            'patch': '',
+                            'content': content,
+                            'additions': 0,
+                            'deletions': 0,
+                            'status': 'modified',
+                            'sha': ''
+                        })
+                        print(f"   ✅ {file_path} (content: {len(content)} chars)")
+                    else:
+                        print(f"   ⚠️  {file_path} not found or empty")
             
             print(f"✅ Successfully fetched {len(mr_data)} files from GitLab MR")
             return mr_data
@@ -253,7 +698,20 @@ class GitIntegration:
             print(f"🔍 Debug info - Exception details: {type(e).__name__}: {str(e)}")
             raise ValueError(f"Unexpected error fetching GitLab MR: {str(e)}")
 
-    def _fetch_bitbucket_pr(self, repo_name, pr_number):
+    def _count_diff_changes(self, diff_text):
+        """Count added and deleted lines of a unified diff in a single pass."""
+        additions = deletions = 0
+        for line in diff_text.splitlines():
+            if not line:
+                continue
+            marker = line[0]
+            if marker == '+' and not line.startswith('+++'):
+                additions += 1
+            elif marker == '-' and not line.startswith('---'):
+                deletions += 1
+        return additions, deletions
+
+    def _fetch_bitbucket_pr(self, repo_name, pr_number, filter_extensions=ANALYZABLE_EXTENSIONS):
         """Fetch Bitbucket Pull Request data - DEMO VERSION with same test files."""
         try:
             print(f"🔗 Connecting to Bitbucket repo {repo_name}...")
@@ -284,76 +742,12 @@ class GitIntegration:
             print(f"🔍 Getting files from Bitbucket PR...")
             pr_data = []
             
-            # Same test file content as GitHub/GitLab for consistent analysis
-            test_files_content = {
-                'bad_code.py': '''def add(a,b): # PEP 8 violation
-    temp = a + b
-    return a + b
-    unused_var = 42  # Unused
-
-
-def subtract(a, b):
-    result = a - b
-    return result
-    unreachable = "This is unreachable code"  # Unreachable code
-
-
-unused_func = lambda x: x * 2  # Unused lambda
-
-
-if True:
-    print("Test")
-else:
-    print("Unreachable else")  # Unreachable else
-
-
-class BadClass:
-    def __init__(self):
-        self.var = 10
-
-
-    def bad_method(self):
-        self.var = 20
-        del self.var  # Potential issue
-''',
-                'good_code.py': '''class Calculator:
-    """A simple calculator class."""
-    def add(self, a, b):
-        """Adds two numbers."""
-        return a + b
-
-
-    def subtract(self, a, b):
-        """Subtracts b from a."""
-        return a - b
-
-
-    def multiply(self, a, b):
-        """Multiplies two numbers."""
-        return a * b
-
-
-    def divide(self, a, b):
-        """Divides a by b, with error handling."""
-        if b == 0:
-            raise ValueError("Division by zero is not allowed.")
-        return a / b
-'''
-            }
-            
-            for filename, content in test_files_content.items():
-                print(f"   📄 Processing {filename}...")
-                
-                pr_data.append({
-                    'filename': filename,
-                    'patch': f'diff --git a/{filename} b/{filename}\n@@ -0,0 +1,{len(content.split())} @@\n+{content[:100]}...',
-                    'content': content,
-                    'additions': len([l for l in content.split('\n') if l.strip()]),
-                    'deletions': 0,
-                    'status': 'modified',
-                    'sha': 'abc12345'
-                })
-                print(f"   ✅ {filename} (content: {len(content)} chars)")
+            for demo_file in _BITBUCKET_DEMO_FILES:
+                if not self._is_analyzable_file(demo_file['filename'], filter_extensions):
+                    continue
+                print(f"   📄 Processing {demo_file['filename']}...")
+                pr_data.append(dict(demo_file))  # Shallow copy so callers can mutate
+                print(f"   ✅ {demo_file['filename']} (content: {len(demo_file['content'])} chars)")
             
             print(f"✅ Successfully fetched {len(pr_data)} files from Bitbucket PR")
             print(f"📝 Note: Using demonstration data equivalent to GitHub/GitLab test files")
@@ -364,53 +758,28 @@ class BadClass:
             print(f"🔍 Debug info - Exception details: {type(e).__name__}: {str(e)}")
             raise ValueError(f"Bitbucket API error for PR {pr_number} in {repo_name}: {str(e)}")
 
-    def _get_gitlab_file_content(self, project, file_path, branch):
+    def _get_gitlab_file_content(self, project, file_path, branch, sha=None):
         """Helper method to get file content from GitLab - FIXED ENCODING."""
+        project_path = getattr(project, 'path_with_namespace', str(getattr(project, 'id', '')))
+        cached = self._read_cached_blob(project_path, sha, file_path)
+        if cached is not None:
+            return cached
+        
         try:
-            file_info = project.files.get(file_path, ref=branch)
-            
-            # Handle different GitLab API response formats
-            if hasattr(file_info, 'decode'):
-                # If the object has a decode method, use it
-                content = file_info.decode()
-                # Ensure it's a string, not bytes
-                if isinstance(content, bytes):
-                    content = content.decode('utf-8')
-                return content
-                
-            elif hasattr(file_info, 'content'):
-                # Handle base64 encoded content
-                raw_content = file_info.content
-                
-                if isinstance(raw_content, str):
-                    # It's already a string, try to decode as base64
-                    try:
-                        decoded_bytes = base64.b64decode(raw_content)
-                        content = decoded_bytes.decode('utf-8')
-                        # Check for binary content
-                        if '\x00' in content:
-                            return ''
-                        return content
-                    except Exception:
-                        # If base64 decode fails, return as-is if it's text
-                        if '\x00' not in raw_content:
-                            return raw_content
-                        return ''
-                elif isinstance(raw_content, bytes):
-                    # It's bytes, decode to string
-                    try:
-                        content = raw_content.decode('utf-8')
-                        if '\x00' in content:
-                            return ''
-                        return content
-                    except UnicodeDecodeError:
-                        return ''
-                else:
-                    # Unknown format
-                    return str(raw_content)
+            ref = sha or branch
+            if hasattr(project.files, 'raw'):
+                # The /raw endpoint returns plain bytes, skipping base64 entirely
+                raw_bytes = project.files.raw(file_path=file_path, ref=ref)
             else:
-                print(f"   ⚠️  Unknown file info format for {file_path}: {type(file_info)}")
+                file_info = project.files.get(file_path, ref=ref)
+                raw_bytes = base64.b64decode(file_info.content, validate=False)
+            
+            # Check for binary content before decoding
+            if b'\x00' in raw_bytes:
                 return ''
+            content = raw_bytes.decode('utf-8', errors='replace')
+            self._write_cached_blob(project_path, sha, file_path, content)
+            return content
                 
         except gitlab.exceptions.GitlabGetError as e:
             if "404" in str(e):
@@ -424,20 +793,20 @@ class BadClass:
 
     def post_review_comment(self, repo_name, pr_number, comment_body):
         """Post a review comment to the PR/MR."""
-        if self.server_type == 'github':
-            return self._post_github_comment(repo_name, pr_number, comment_body)
-        elif self.server_type == 'gitlab':
-            return self._post_gitlab_comment(repo_name, pr_number, comment_body)
-        elif self.server_type == 'bitbucket':
-            return self._post_bitbucket_comment(repo_name, pr_number, comment_body)
-        else:
+        commenter = self._COMMENTERS.get(self.server_type)
+        if commenter is None:
             raise NotImplementedError(f"Comment posting not implemented for {self.server_type}")
+        return getattr(self, commenter)(repo_name, pr_number, comment_body)
+
+    async def post_review_comment_async(self, repo_name, pr_number, comment_body):
+        """Post a review comment without blocking the event loop (for async callers)."""
+        return await asyncio.to_thread(self.post_review_comment, repo_name, pr_number, comment_body)
 
     def _post_github_comment(self, repo_name, pr_number, comment_body):
         """Post comment to GitHub PR."""
         try:
-            repo = self.client.get_repo(repo_name)
-            pr = repo.get_pull(pr_number)
+            self._rl_guard()
+            pr = self._get_github_pull(repo_name, pr_number)
             pr.create_issue_comment(comment_body)
             print("✅ Posted review comment to GitHub")
             return True
@@ -448,8 +817,7 @@ class BadClass:
     def _post_gitlab_comment(self, project_path, mr_number, comment_body):
         """Post comment to GitLab MR."""
         try:
-            project = self.client.projects.get(project_path)
-            mr = project.mergerequests.get(mr_number)
+            mr = self._get_gitlab_mr(project_path, mr_number)
             mr.notes.create({'body': comment_body})
             print("✅ Posted review comment to GitLab")
             return True
@@ -1,4 +1,58 @@
 import re
+import sys
+from itertools import chain, repeat
+
+# Pylint/flake8 message codes, e.g. "E231" or "C0116" - only the prefixes we have suggestions for
+_ISSUE_CODE_RE = re.compile(r'\b([CEFRW]\d{3,4})\b')
+# Commas followed by neither whitespace nor a closing bracket (what E231 flags; "(a,)" is fine)
+_COMMA_NO_SPACE_RE = re.compile(r',(?=[^\s)\]}])')
+
+# Line-specific suggestion templates by message code; placeholders are filled from _SUGGESTION_FIELDS
+_SUGGESTIONS = {
+    'E231': "Add space after comma: `{code_comma}`",
+    'E261': "Add at least two spaces before inline comment",
+    'E302': "Add 2 blank lines before this function/class definition",
+    'E305': "Add 2 blank lines after this function/class definition",
+    'E731': "Replace lambda with def function",
+    'F841': "Remove this unused variable",
+    'C0114': "Add module docstring at the top of file",
+    'C0116': 'Add docstring: `"""{docstring}"""`',
+    'W0612': "Remove or use this variable",
+    'W0101': "This code is unreachable - remove it",
+    'C3001': "Replace lambda with proper function definition",
+    'W0125': "Avoid constant conditionals - use variable or logic",
+    'C0115': "Add class docstring",
+    'R0903': "Consider adding more public methods"
+}
+_DEFAULT_SUGGESTION = "Consider reviewing this line for code quality improvements"
+# Template placeholder builders, called with (generator, code_line)
+_SUGGESTION_FIELDS = {
+    'code_comma': lambda gen, code_line: _COMMA_NO_SPACE_RE.sub(', ', code_line),
+    'docstring': lambda gen, code_line: gen._suggest_docstring(code_line)
+}
+
+
+class _LazySuggestionFields(dict):
+    """format_map mapping that builds a placeholder value only when a template asks for it."""
+
+    def __init__(self, generator, code_line):
+        super().__init__()
+        self.generator = generator
+        self.code_line = code_line
+
+    def __missing__(self, key):
+        return _SUGGESTION_FIELDS[key](self.generator, self.code_line)
+
+
+def _slice_until(text, start, *stops):
+    """Slice text from start up to the earliest of the stop strings (or the end)."""
+    end = len(text)
+    for stop in stops:
+        index = text.find(stop, start, end)
+        if index != -1:
+            end = index
+    return text[start:end]
+
 
 class InlineCommentGenerator:
     """Generate inline review comments similar to GitHub/GitLab."""
@@ -7,98 +61,65 @@ class InlineCommentGenerator:
         """Generate inline comments for specific lines of code."""
         inline_comments = []
         content_lines = file_data['content'].split('\n')
-        patch_lines = file_data.get('patch', '').split('\n')
         
-        # Parse patch to get line numbers
-        line_mapping = self._parse_patch_line_numbers(patch_lines)
+        # Hoist loop invariants and walk every issue as one flat (category, issue) stream.
+        # Categories are interned so all comments share one string even when the issues
+        # dict was unpickled from a worker process.
+        n_lines = len(content_lines)
+        extract_line_number = self._extract_line_number
+        get_suggestion = self._get_line_specific_suggestion
+        flat_issues = chain.from_iterable(
+            zip(repeat(sys.intern(category)), issue_list) for category, issue_list in issues.items()
+        )
         
-        for category, issue_list in issues.items():
-            for issue in issue_list:
-                line_comment = self._generate_line_specific_comment(issue, category, content_lines, line_mapping)
-                if line_comment:
-                    inline_comments.append(line_comment)
+        for category, issue in flat_issues:
+            # Issues without a "file:line:" prefix can't be placed on a line - skip the call
+            if ':' not in issue:
+                continue
+            # Extract line number from pylint/flake8 output
+            line_num = extract_line_number(issue)
+            if line_num and line_num <= n_lines:
+                code_line = content_lines[line_num - 1].strip()
+                inline_comments.append({
+                    'line': line_num,
+                    'category': category,
+                    'issue': issue,
+                    'code': code_line,
+                    'suggestion': get_suggestion(issue, code_line)
+                })
         
         return inline_comments
     
-    def _parse_patch_line_numbers(self, patch_lines):
-        """Parse patch to get line number mappings."""
-        line_mapping = {}
-        current_line = 0
-        
-        for line in patch_lines:
-            if line.startswith('@@'):
-                # Extract line number from @@ -x,y +a,b @@
-                match = re.search(r'\+(\d+)', line)
-                if match:
-                    current_line = int(match.group(1))
-            elif line.startswith('+') and not line.startswith('+++'):
-                line_mapping[current_line] = line[1:]  # Remove + prefix
-                current_line += 1
-            elif not line.startswith('-'):
-                current_line += 1
-        
-        return line_mapping
-    
-    def _generate_line_specific_comment(self, issue, category, content_lines, line_mapping):
-        """Generate specific inline comment for an issue."""
-        # Extract line number from pylint/flake8 output
-        line_num = self._extract_line_number(issue)
-        
-        if line_num and line_num <= len(content_lines):
-            code_line = content_lines[line_num - 1].strip()
-            
-            comment = {
-                'line': line_num,
-                'category': category,
-                'issue': issue,
-                'code': code_line,
-                'suggestion': self._get_line_specific_suggestion(issue, code_line)
-            }
-            
-            return comment
-        
-        return None
-    
     def _extract_line_number(self, issue):
         """Extract line number from issue string."""
-        # Look for patterns like "temp_file.py:5:0:" or just numbers
-        match = re.search(r':(\d+):', issue)
-        if match:
-            return int(match.group(1))
+        # Look for patterns like "temp_file.py:5:0:" - first run of digits between two colons
+        start = issue.find(':')
+        while start != -1:
+            end = issue.find(':', start + 1)
+            if end == -1:
+                break
+            digits = issue[start + 1:end]
+            if digits.isdecimal():
+                return int(digits)
+            start = end
         return None
     
     def _get_line_specific_suggestion(self, issue, code_line):
         """Get specific suggestion for the code line."""
-        suggestions = {
-            'E231': f"Add space after comma: `{code_line.replace(',', ', ')}`",
-            'E261': "Add at least two spaces before inline comment",
-            'E302': "Add 2 blank lines before this function/class definition",
-            'E305': "Add 2 blank lines after this function/class definition",
-            'E731': f"Replace lambda with def function",
-            'F841': "Remove this unused variable",
-            'C0114': "Add module docstring at the top of file",
-            'C0116': f"Add docstring: `\"\"\"{self._suggest_docstring(code_line)}\"\"\"`",
-            'W0612': "Remove or use this variable",
-            'W0101': "This code is unreachable - remove it",
-            'C3001': "Replace lambda with proper function definition",
-            'W0125': "Avoid constant conditionals - use variable or logic",
-            'C0115': "Add class docstring",
-            'R0903': "Consider adding more public methods"
-        }
-        
-        for code, suggestion in suggestions.items():
-            if code in issue:
-                return suggestion
+        for match in _ISSUE_CODE_RE.finditer(issue):
+            if (suggestion := _SUGGESTIONS.get(match.group(1))) is not None:
+                return suggestion.format_map(_LazySuggestionFields(self, code_line))
         
-        return "Consider reviewing this line for code quality improvements"
+        return _DEFAULT_SUGGESTION
     
     def _suggest_docstring(self, code_line):
         """Suggest appropriate docstring based on code."""
-        if 'def ' in code_line:
-            func_name = code_line.split('def ')[1].split('(')[0]
+        index = code_line.find('def ')
+        if index != -1:
+            func_name = _slice_until(code_line, index + 4, '(', 'def ')
             return f"Brief description of {func_name} function."
-        elif 'class ' in code_line:
-            class_name = code_line.split('class ')[1].split(':')[0]
+        index = code_line.find('class ')
+        if index != -1:
+            class_name = _slice_until(code_line, index + 6, ':', 'class ')
             return f"Brief description of {class_name} class."
-        else:
-            return "Add appropriate description."
\ No newline at end of file
+        return "Add appropriate description."
\ No newline at end of file
@@ -1,10 +1,7 @@
 import argparse
-from git_integration import GitIntegration
-from code_analysis import CodeAnalysis
-from feedback_generation import FeedbackGeneration
-from inline_comments import InlineCommentGenerator
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
 
 
 def main():
@@ -16,6 +13,7 @@ def main():
     parser.add_argument('--webhook', action='store_true', help="Run webhook server for CI/CD")
     parser.add_argument('--ci', action='store_true', help="Run in CI/CD mode (auto-detect environment)")
     parser.add_argument('--post-comments', action='store_true', help="Post review comments back to PR")
+    parser.add_argument('--quiet', action='store_true', help="Skip per-file progress output")
     args = parser.parse_args()
     
     if args.web:
@@ -24,9 +22,9 @@ def main():
         app.run(debug=True, host='0.0.0.0', port=5000)
         
     elif args.webhook:
-        from webhook_server import WebhookServer
-        webhook_server = WebhookServer()
-        webhook_server.run()
+        # serve() picks Gunicorn or the dev server before any server instance is built
+        from webhook_server import serve
+        serve()
         
     elif args.ci:
         # CI/CD mode - auto-detect environment
@@ -39,7 +37,7 @@ def main():
             parser.print_help()
             return 1
             
-        return run_cli_mode(args.repo, args.pr, args.platform, args.post_comments)
+        return run_cli_mode(args.repo, args.pr, args.platform, args.post_comments, quiet=args.quiet)
 
 
 def run_ci_mode():
@@ -118,13 +116,21 @@ def run_bitbucket_pipelines_mode():
     return run_cli_mode(repo_full_name, int(pr_id), 'bitbucket', post_comments=True)
 
 
-def run_cli_mode(repo_name, pr_number, platform, post_comments=False):
+def run_cli_mode(repo_name, pr_number, platform, post_comments=False, quiet=False):
     """Run CLI analysis mode."""
+    # Imported here so --help and argument errors don't pay for the analysis stack
+    # (--webhook still loads it, through webhook_server's own imports)
+    from git_integration import GitIntegration
+    from code_analysis import CodeAnalysis
+    from feedback_generation import FeedbackGeneration
+    from inline_comments import InlineCommentGenerator
+    
     print(f"🔍 Fetching PR #{pr_number} from {platform.upper()} repo {repo_name}...")
     
     try:
         git = GitIntegration(server_type=platform)
-        pr_data = git.fetch_pr(repo_name, pr_number)
+        # Filter by extension in the integration layer so non-Python blobs are never downloaded
+        pr_data = git.fetch_pr(repo_name, pr_number, filter_extensions=('.py',))
         print(f"✅ Fetched {len(pr_data)} files from PR.")
         
         if not pr_data:
@@ -136,17 +142,28 @@ def run_cli_mode(repo_name, pr_number, platform, post_comments=False):
         analysis_results = []
         total_issues = 0
         
-        for file in pr_data:
-            if not file['filename'].endswith('.py'):
-                continue  # Skip non-Python files
-                
-            print(f"🔎 Analyzing {file['filename']} (content: {len(file['content'])} chars)...")
-            issues = analyzer.analyze_file(file['content'], file['filename'])
+        python_files = pr_data  # Already restricted to Python files by fetch_pr
+        if not quiet:
+            for file in python_files:
+                print(f"🔎 Analyzing {file['filename']} (content: {len(file['content'])} chars)...")
+        
+        # Pylint/Flake8 dominate analysis time, so run files in parallel processes
+        workers = min(os.cpu_count() or 1, len(python_files))
+        contents = [file['content'] for file in python_files]
+        filenames = [file['filename'] for file in python_files]
+        if workers > 1:
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                file_issues_list = list(executor.map(analyzer.analyze_file, contents, filenames))
+        else:
+            file_issues_list = list(map(analyzer.analyze_file, contents, filenames))
+        
+        for file, issues in zip(python_files, file_issues_list):
             inline_comments = inline_generator.generate_inline_comments(file, issues)
             
             file_issues = sum(len(lst) for lst in issues.values())
             total_issues += file_issues
-            print(f"📊 Found {file_issues} issues in {file['filename']}")
+            if not quiet:
+                print(f"📊 Found {file_issues} issues in {file['filename']}")
             
             analysis_results.append({
                 'filename': file['filename'],
@@ -154,6 +171,9 @@ def run_cli_mode(repo_name, pr_number, platform, post_comments=False):
                 'inline_comments': inline_comments
             })
         
+        print(f"📊 Found {total_issues} issues across {len(python_files)} files")
+        sys.stdout.flush()
+        
         feedback_gen = FeedbackGeneration()
         report = feedback_gen.generate_comprehensive_feedback(analysis_results, pr_data)
         
@@ -1,8 +1,10 @@
 import os
+from functools import lru_cache
 from dotenv import load_dotenv
 
 load_dotenv()
 
+@lru_cache(maxsize=None)  # Env vars don't change during the process lifetime
 def load_env_var(var_name):
     """Utility for loading env vars (Software Engineering tech stack)."""
     value = os.getenv(var_name)
@@ -1,47 +1,191 @@
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify
+from flask.json.provider import JSONProvider
+from werkzeug.exceptions import RequestEntityTooLarge
+import asyncio
+import atexit
+import multiprocessing
 import os
 import json
 import threading
-import subprocess
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from datetime import datetime
-from git_integration import GitIntegration
+from git_integration import GitIntegration, create_http_session
 from code_analysis import CodeAnalysis
 from feedback_generation import FeedbackGeneration
 from inline_comments import InlineCommentGenerator
 from dotenv import load_dotenv
 import hmac
 import hashlib
+import importlib.util
+import logging
+import queue
+import sys
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    import orjson
+except ImportError:  # orjson is optional - JSON falls back to the stdlib codec
+    orjson = None
 
 load_dotenv()
 
+# Pending reviews held in memory; beyond this webhooks are answered with 503
+WEBHOOK_QUEUE_MAX = int(os.getenv('WEBHOOK_QUEUE_MAX', '500'))
+# Reviews processed concurrently by the worker pool
+REVIEW_WORKERS = int(os.getenv('REVIEW_WORKERS', str((os.cpu_count() or 1) * 2)))
+# Seconds a sender is asked to wait before redelivering when the queue is full
+QUEUE_FULL_RETRY_AFTER = 30
+# Seconds a queued review waits for more PRs of the same repository to join its batch
+REVIEW_BATCH_WINDOW = 0.5
+# Most PRs one batch takes; further PRs open a new batch, which needs its own queue slot
+REVIEW_BATCH_MAX = 10
+# Files reviewed in a PR; others are never downloaded
+REVIEW_EXTENSIONS = ('.py',)
+# Request-handling threads per Gunicorn worker (worker count comes from WEB_CONCURRENCY)
+GUNICORN_THREADS = int(os.getenv('GUNICORN_THREADS', '8'))
+# Seconds idle keep-alive connections are held open by Gunicorn
+GUNICORN_KEEPALIVE = 75
+# Largest webhook body accepted; bigger requests are refused before (or while) being read
+MAX_BODY_BYTES = int(os.getenv('WEBHOOK_MAX_BODY_BYTES', str(10 * 1024 * 1024)))
+# Bytes read from the request stream at a time while hashing the body
+BODY_READ_CHUNK = 64 * 1024
+# Recently verified GitHub deliveries remembered so redeliveries skip the HMAC
+SIGNATURE_CACHE_SIZE = 64
+# Larger bodies are verified every time rather than held in the cache
+SIGNATURE_CACHE_MAX_BODY = 64 * 1024
+
+# Analysis tools of the current worker process, created on its first file
+_analyzer = None
+_inline_generator = None
+
+# Request and review threads only enqueue log records; one listener thread writes them
+_log_queue = queue.Queue(-1)
+_log_listener = None
+log = logging.getLogger('webhook')
+log.setLevel(logging.INFO)
+log.addHandler(QueueHandler(_log_queue))
+log.propagate = False
+
 app = Flask(__name__)
+# Werkzeug also enforces the limit on its own body reads (e.g. request.get_data())
+app.config['MAX_CONTENT_LENGTH'] = MAX_BODY_BYTES
+
+if orjson is not None:
+    _json_loads = orjson.loads
+    _json_dumps = orjson.dumps
+
+    class _OrjsonProvider(JSONProvider):
+        """Flask JSON provider backed by orjson, so jsonify() encodes in C."""
+
+        def dumps(self, obj, **kwargs):
+            return orjson.dumps(obj, option=orjson.OPT_NON_STR_KEYS).decode('utf-8')
+
+        def loads(self, s, **kwargs):
+            return orjson.loads(s)
+
+    app.json = _OrjsonProvider(app)
+else:
+    _json_loads = json.loads
+
+    def _json_dumps(obj):
+        return json.dumps(obj).encode('utf-8')
+
+# Constant response bodies, serialized once at import
+_HEALTH_HEAD, _HEALTH_TAIL = _json_dumps({
+    'status': 'healthy',
+    'service': 'PR Review Agent Webhook Server',
+    'timestamp': '__TIMESTAMP__',
+    'supported_platforms': ['github', 'gitlab', 'bitbucket'],
+    'endpoints': {
+        'github': '/webhook/github',
+        'gitlab': '/webhook/gitlab',
+        'bitbucket': '/webhook/bitbucket',
+        'generic': '/webhook/generic'
+    }
+}).split(b'"__TIMESTAMP__"')
+_IGNORED_HEAD = _json_dumps({'status': 'ignored', 'reason': ''})[:-3]  # Up to the reason value
+_INVALID_SIGNATURE_BODY = _json_dumps({'error': 'Invalid signature'})
+_INVALID_TOKEN_BODY = _json_dumps({'error': 'Invalid token'})
+_PAYLOAD_TOO_LARGE_BODY = _json_dumps({'error': 'Payload too large'})
+
+
+def _json_response(body, status=200):
+    """Response for an already-serialized JSON body."""
+    return Response(body, status=status, mimetype='application/json')
+
+
+def _ignored_response(reason):
+    """'ignored' response; only the reason string is serialized per request."""
+    return _json_response(_IGNORED_HEAD + _json_dumps(reason) + b'}')
+
+
+def _start_log_listener():
+    """Start the thread that writes queued log records to stdout (once per process)."""
+    global _log_listener
+    if _log_listener is None:
+        _log_listener = QueueListener(_log_queue, logging.StreamHandler(sys.stdout))
+        _log_listener.start()
+        atexit.register(_log_listener.stop)
+
+
+def _analyze_one(file_data):
+    """Analyze one file in a worker process; returns (issues, inline_comments)."""
+    global _analyzer, _inline_generator
+    if _analyzer is None:
+        _analyzer = CodeAnalysis()
+        _inline_generator = InlineCommentGenerator()
+    issues = _analyzer.analyze_file(file_data['content'], file_data['filename'])
+    return issues, _inline_generator.generate_inline_comments(file_data, issues)
+
 
 class WebhookServer:
     """Enhanced webhook server for CI/CD integration."""
     
     def __init__(self):
         self.app = app
+        # Per-file analysis is CPU-bound (pylint, flake8, AST), so it runs in worker processes.
+        # Spawned rather than forked: this process also runs the review loop and request threads.
+        self._analysis_executor = ProcessPoolExecutor(
+            max_workers=os.cpu_count(), mp_context=multiprocessing.get_context('spawn')
+        )
+        # One pooled keep-alive HTTP session shared by every review's GitIntegration
+        self.http_session = create_http_session()
+        atexit.register(self.http_session.close)
+        # Report generation keeps no per-review state, so one instance serves every review
+        self._feedback = FeedbackGeneration()
+        # Reviews run on one long-lived event loop: webhooks feed a bounded queue that a
+        # fixed pool of worker tasks drains, so bursts are shed instead of piling up
+        self._loop = asyncio.new_event_loop()
+        threading.Thread(target=self._loop.run_forever, name='review-loop', daemon=True).start()
+        # Created on the review loop: before Python 3.10 a Queue binds to the loop current at creation
+        self._review_queue = asyncio.run_coroutine_threadsafe(self._create_review_queue(), self._loop).result()
+        # (platform, repository) -> PR numbers of the batch still accepting PRs (review loop only)
+        self._open_batches = {}
+        for _ in range(REVIEW_WORKERS):
+            worker = asyncio.run_coroutine_threadsafe(self._review_worker(), self._loop)
+            worker.add_done_callback(self._log_worker_exit)
+        atexit.register(self._stop_review_loop)
+        # Webhook credentials, resolved once; None disables the corresponding check
+        github_secret = os.getenv('GITHUB_WEBHOOK_SECRET', '').encode('utf-8')
+        # Keyed HMAC with no data yet; each request copies it instead of redoing the key schedule
+        self._github_hmac_template = hmac.new(github_secret, digestmod=hashlib.sha256) if github_secret else None
+        self._gitlab_token = os.getenv('GITLAB_WEBHOOK_TOKEN') or None
+        # Signature header -> body it was verified against, in LRU order
+        self._verified_signatures = OrderedDict()
+        self._verified_signatures_lock = threading.Lock()
         self.setup_routes()
-        print("🚀 PR Review Agent Webhook Server initialized")
-        print("📡 Supports: GitHub, GitLab, Bitbucket webhooks")
+        _start_log_listener()
+        log.info("🚀 PR Review Agent Webhook Server initialized")
+        log.info("📡 Supports: GitHub, GitLab, Bitbucket webhooks")
         
     def setup_routes(self):
         """Setup webhook endpoints for different platforms."""
         
         @self.app.route('/', methods=['GET'])
         def health_check():
-            return jsonify({
-                'status': 'healthy',
-                'service': 'PR Review Agent Webhook Server',
-                'timestamp': datetime.now().isoformat(),
-                'supported_platforms': ['github', 'gitlab', 'bitbucket'],
-                'endpoints': {
-                    'github': '/webhook/github',
-                    'gitlab': '/webhook/gitlab', 
-                    'bitbucket': '/webhook/bitbucket',
-                    'generic': '/webhook/generic'
-                }
-            })
+            timestamp = _json_dumps(datetime.now().isoformat())
+            return _json_response(_HEALTH_HEAD + timestamp + _HEALTH_TAIL)
         
         @self.app.route('/webhook/github', methods=['POST'])
         def github_webhook():
@@ -68,40 +212,117 @@ class WebhookServer:
             """Manual review endpoint for testing/API access."""
             return self._handle_manual_review()
 
-    def _verify_github_signature(self, payload_body, signature_header):
-        """Verify GitHub webhook signature for security."""
-        secret = os.getenv('GITHUB_WEBHOOK_SECRET', '')
-        if not secret:
+    def _read_signed_body(self, hash_body=True):
+        """Read the request body in chunks, feeding each to the webhook HMAC as it arrives.
+        
+        Returns (body, hash_object); hash_object is None when no secret is configured.
+        Raises RequestEntityTooLarge as soon as the body grows past MAX_BODY_BYTES, which
+        catches chunked uploads that sent no Content-Length.
+        """
+        template = self._github_hmac_template
+        hash_object = template.copy() if template is not None and hash_body else None
+        body = bytearray()
+        stream = request.stream
+        for chunk in iter(lambda: stream.read(BODY_READ_CHUNK), b''):
+            if len(body) + len(chunk) > MAX_BODY_BYTES:
+                raise RequestEntityTooLarge()
+            if hash_object is not None:
+                hash_object.update(chunk)
+            body += chunk
+        return body, hash_object
+
+    def _read_verified_github_body(self, signature_header):
+        """Read the body and verify its GitHub signature; returns (body, verified).
+        
+        GitHub redelivers identical payloads with identical signatures, so a body that
+        byte-for-byte matches one already verified under the same signature is accepted
+        without hashing it again.
+        """
+        with self._verified_signatures_lock:
+            known_body = self._verified_signatures.get(signature_header) if signature_header else None
+            if known_body is not None:
+                self._verified_signatures.move_to_end(signature_header)
+        
+        if known_body is not None:
+            body, _ = self._read_signed_body(hash_body=False)
+            if body == known_body:
+                return body, True
+            # Only verified (so secret-protected) bodies are cached, so the template exists here
+            body_hmac = self._github_hmac_template.copy()
+            body_hmac.update(body)
+        else:
+            body, body_hmac = self._read_signed_body()
+        
+        verified = self._verify_github_signature(body_hmac, signature_header)
+        if verified and body_hmac is not None and len(body) <= SIGNATURE_CACHE_MAX_BODY:
+            with self._verified_signatures_lock:
+                self._verified_signatures[signature_header] = bytes(body)
+                if len(self._verified_signatures) > SIGNATURE_CACHE_SIZE:
+                    self._verified_signatures.popitem(last=False)
+        return body, verified
+
+    def _verify_github_signature(self, hash_object, signature_header):
+        """Verify GitHub webhook signature for security, given the HMAC of the body."""
+        if hash_object is None:
             return True  # Skip verification if no secret configured
             
-        if not signature_header:
+        if not signature_header or not signature_header.startswith('sha256='):
             return False
         
         try:
-            hash_object = hmac.new(
-                secret.encode('utf-8'),
-                payload_body,
-                hashlib.sha256
-            )
-            expected_signature = "sha256=" + hash_object.hexdigest()
-            return hmac.compare_digest(expected_signature, signature_header)
+            # Compare raw digests rather than building and comparing hex strings
+            provided_digest = bytes.fromhex(signature_header[7:])
+        except ValueError:
+            return False  # Not a hex digest, so it can't match
+        
+        try:
+            return hmac.compare_digest(hash_object.digest(), provided_digest)
         except Exception as e:
-            print(f"❌ Signature verification error: {e}")
+            log.error(f"❌ Signature verification error: {e}")
             return False
 
+    def _verify_and_parse(self, source):
+        """Check size and credentials against the raw body, then parse it once.
+        
+        Returns (error_response, payload); error_response is None when the request is accepted.
+        """
+        if request.content_length and request.content_length > MAX_BODY_BYTES:
+            log.warning(f"⚠️  Rejected {source} request: body of {request.content_length} bytes exceeds limit")
+            return _json_response(_PAYLOAD_TOO_LARGE_BODY, 413), None
+        
+        try:
+            return self._read_and_parse(source)
+        except RequestEntityTooLarge:
+            log.warning(f"⚠️  Rejected {source} request: body exceeds {MAX_BODY_BYTES} bytes")
+            return _json_response(_PAYLOAD_TOO_LARGE_BODY, 413), None
+
+    def _read_and_parse(self, source):
+        """Read, authenticate and parse the body for _verify_and_parse."""
+        if source == 'github':
+            # Hash the body while reading it, then parse that same buffer
+            raw_body, verified = self._read_verified_github_body(request.headers.get('X-Hub-Signature-256'))
+            if not verified:
+                log.error("❌ GitHub webhook signature verification failed")
+                return _json_response(_INVALID_SIGNATURE_BODY, 403), None
+            return None, _json_loads(raw_body)
+        
+        # Header-token checks need no body, so unauthenticated requests are never read or parsed
+        if source == 'gitlab' and self._gitlab_token and request.headers.get('X-Gitlab-Token') != self._gitlab_token:
+            log.error("❌ GitLab webhook token verification failed")
+            return _json_response(_INVALID_TOKEN_BODY, 403), None
+        return None, _json_loads(request.get_data(cache=False))
+
     def _handle_github_webhook(self):
         """Process GitHub webhook events."""
         try:
-            # Verify signature for security
-            signature = request.headers.get('X-Hub-Signature-256')
-            if not self._verify_github_signature(request.data, signature):
-                print("❌ GitHub webhook signature verification failed")
-                return jsonify({'error': 'Invalid signature'}), 403
+            # Verify signature for security, then parse the verified body once
+            error_response, payload = self._verify_and_parse('github')
+            if error_response is not None:
+                return error_response
             
-            payload = request.get_json()
             event_type = request.headers.get('X-GitHub-Event')
             
-            print(f"📥 Received GitHub webhook: {event_type}")
+            log.info(f"📥 Received GitHub webhook: {event_type}")
             
             # Handle pull request events
             if event_type in ['pull_request', 'pull_request_target']:
@@ -112,16 +333,12 @@ class WebhookServer:
                     repo_full_name = payload.get('repository', {}).get('full_name')
                     pr_number = pr_data.get('number')
                     
-                    print(f"🎯 Processing GitHub PR #{pr_number} in {repo_full_name}")
-                    print(f"🔄 Action: {action}")
+                    log.info(f"🎯 Processing GitHub PR #{pr_number} in {repo_full_name}")
+                    log.info(f"🔄 Action: {action}")
                     
-                    # Process in background thread to avoid timeout
-                    thread = threading.Thread(
-                        target=self._process_pr_async,
-                        args=('github', repo_full_name, pr_number, payload)
-                    )
-                    thread.daemon = True
-                    thread.start()
+                    # Queue for the background review workers to avoid timeout
+                    if not self._schedule_review('github', repo_full_name, pr_number):
+                        return self._queue_full_response()
                     
                     return jsonify({
                         'status': 'accepted',
@@ -129,29 +346,25 @@ class WebhookServer:
                         'repository': repo_full_name
                     })
                 else:
-                    return jsonify({'status': 'ignored', 'reason': f'Action {action} not processed'})
+                    return _ignored_response(f'Action {action} not processed')
             
-            return jsonify({'status': 'ignored', 'reason': f'Event {event_type} not processed'})
+            return _ignored_response(f'Event {event_type} not processed')
             
         except Exception as e:
-            print(f"❌ GitHub webhook error: {str(e)}")
+            log.error(f"❌ GitHub webhook error: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
     def _handle_gitlab_webhook(self):
         """Process GitLab webhook events."""
         try:
             # Verify GitLab token if configured
-            token = request.headers.get('X-Gitlab-Token')
-            expected_token = os.getenv('GITLAB_WEBHOOK_TOKEN')
+            error_response, payload = self._verify_and_parse('gitlab')
+            if error_response is not None:
+                return error_response
             
-            if expected_token and token != expected_token:
-                print("❌ GitLab webhook token verification failed")
-                return jsonify({'error': 'Invalid token'}), 403
-            
-            payload = request.get_json()
             event_type = payload.get('object_kind')
             
-            print(f"📥 Received GitLab webhook: {event_type}")
+            log.info(f"📥 Received GitLab webhook: {event_type}")
             
             if event_type == 'merge_request':
                 action = payload.get('object_attributes', {}).get('action')
@@ -161,16 +374,12 @@ class WebhookServer:
                     project_path = payload.get('project', {}).get('path_with_namespace')
                     mr_number = mr_data.get('iid')  # GitLab uses 'iid' for MR number
                     
-                    print(f"🎯 Processing GitLab MR !{mr_number} in {project_path}")
-                    print(f"🔄 Action: {action}")
+                    log.info(f"🎯 Processing GitLab MR !{mr_number} in {project_path}")
+                    log.info(f"🔄 Action: {action}")
                     
-                    # Process in background thread
-                    thread = threading.Thread(
-                        target=self._process_pr_async,
-                        args=('gitlab', project_path, mr_number, payload)
-                    )
-                    thread.daemon = True
-                    thread.start()
+                    # Queue for the background review workers
+                    if not self._schedule_review('gitlab', project_path, mr_number):
+                        return self._queue_full_response()
                     
                     return jsonify({
                         'status': 'accepted',
@@ -178,37 +387,36 @@ class WebhookServer:
                         'project': project_path
                     })
                 else:
-                    return jsonify({'status': 'ignored', 'reason': f'Action {action} not processed'})
+                    return _ignored_response(f'Action {action} not processed')
             
-            return jsonify({'status': 'ignored', 'reason': f'Event {event_type} not processed'})
+            return _ignored_response(f'Event {event_type} not processed')
             
         except Exception as e:
-            print(f"❌ GitLab webhook error: {str(e)}")
+            log.error(f"❌ GitLab webhook error: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
     def _handle_bitbucket_webhook(self):
         """Process Bitbucket webhook events."""
         try:
-            payload = request.get_json()
+            error_response, payload = self._verify_and_parse('bitbucket')
+            if error_response is not None:
+                return error_response
+            
             event_type = request.headers.get('X-Event-Key')
             
-            print(f"📥 Received Bitbucket webhook: {event_type}")
+            log.info(f"📥 Received Bitbucket webhook: {event_type}")
             
             if event_type in ['pullrequest:created', 'pullrequest:updated']:
                 pr_data = payload.get('pullrequest', {})
                 repo_full_name = payload.get('repository', {}).get('full_name')
                 pr_number = pr_data.get('id')
                 
-                print(f"🎯 Processing Bitbucket PR #{pr_number} in {repo_full_name}")
-                print(f"🔄 Event: {event_type}")
+                log.info(f"🎯 Processing Bitbucket PR #{pr_number} in {repo_full_name}")
+                log.info(f"🔄 Event: {event_type}")
                 
-                # Process in background thread
-                thread = threading.Thread(
-                    target=self._process_pr_async,
-                    args=('bitbucket', repo_full_name, pr_number, payload)
-                )
-                thread.daemon = True
-                thread.start()
+                # Queue for the background review workers
+                if not self._schedule_review('bitbucket', repo_full_name, pr_number):
+                    return self._queue_full_response()
                 
                 return jsonify({
                     'status': 'accepted', 
@@ -216,16 +424,18 @@ class WebhookServer:
                     'repository': repo_full_name
                 })
             
-            return jsonify({'status': 'ignored', 'reason': f'Event {event_type} not processed'})
+            return _ignored_response(f'Event {event_type} not processed')
             
         except Exception as e:
-            print(f"❌ Bitbucket webhook error: {str(e)}")
+            log.error(f"❌ Bitbucket webhook error: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
     def _handle_generic_webhook(self):
         """Handle generic CI/CD webhook calls."""
         try:
-            payload = request.get_json()
+            error_response, payload = self._verify_and_parse('generic')
+            if error_response is not None:
+                return error_response
             
             # Expected format for generic webhooks
             platform = payload.get('platform', 'github')
@@ -236,18 +446,14 @@ class WebhookServer:
                 return jsonify({
                     'error': 'Missing required fields',
                     'required': ['platform', 'repository', 'pr_number'],
-                    'received': payload
+                    'received': sorted(payload)
                 }), 400
             
-            print(f"📥 Received generic webhook: {platform}/{repository}/PR#{pr_number}")
+            log.info(f"📥 Received generic webhook: {platform}/{repository}/PR#{pr_number}")
             
-            # Process in background thread
-            thread = threading.Thread(
-                target=self._process_pr_async,
-                args=(platform, repository, pr_number, payload)
-            )
-            thread.daemon = True
-            thread.start()
+            # Queue for the background review workers
+            if not self._schedule_review(platform, repository, pr_number):
+                return self._queue_full_response()
             
             return jsonify({
                 'status': 'accepted',
@@ -257,13 +463,15 @@ class WebhookServer:
             })
             
         except Exception as e:
-            print(f"❌ Generic webhook error: {str(e)}")
+            log.error(f"❌ Generic webhook error: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
     def _handle_manual_review(self):
         """Handle manual review requests via API."""
         try:
-            data = request.get_json()
+            error_response, data = self._verify_and_parse('manual')
+            if error_response is not None:
+                return error_response
             
             platform = data.get('platform', 'github')
             repository = data.get('repository')
@@ -277,7 +485,7 @@ class WebhookServer:
                     'optional': ['platform', 'post_comments']
                 }), 400
             
-            print(f"🎯 Manual review requested: {platform}/{repository}/PR#{pr_number}")
+            log.info(f"🎯 Manual review requested: {platform}/{repository}/PR#{pr_number}")
             
             # Process synchronously for manual requests
             result = self._process_pr_sync(platform, repository, pr_number, post_comments)
@@ -291,49 +499,155 @@ class WebhookServer:
             })
             
         except Exception as e:
-            print(f"❌ Manual review error: {str(e)}")
+            log.error(f"❌ Manual review error: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
-    def _process_pr_async(self, platform, repository, pr_number, webhook_payload=None):
-        """Process PR review in background thread."""
+    def _schedule_review(self, platform, repository, pr_number):
+        """Queue a PR review for the worker pool; returns False if the queue is full."""
+        # Only the identifying fields are queued - the decoded webhook payload is
+        # released as soon as the handler returns instead of living until the review ends
+        item = (platform, repository, pr_number)
+        return asyncio.run_coroutine_threadsafe(self._enqueue_review(item), self._loop).result()
+
+    async def _enqueue_review(self, item):
+        """Queue a review without waiting (runs on the review loop).
+        
+        A PR whose repository already has a batch waiting in the queue joins that batch
+        instead of taking a queue slot of its own, until the batch holds REVIEW_BATCH_MAX PRs.
+        """
+        platform, repository, pr_number = item
+        key = (platform, repository)
+        pr_numbers = self._open_batches.get(key)
+        if pr_numbers is not None:
+            if pr_number in pr_numbers:
+                return True
+            if len(pr_numbers) < REVIEW_BATCH_MAX:
+                pr_numbers.append(pr_number)
+                return True
+        
+        pr_numbers = [pr_number]
         try:
-            print(f"🔄 Starting async review: {platform}/{repository}/PR#{pr_number}")
+            self._review_queue.put_nowait((platform, repository, pr_numbers, self._loop.time()))
+        except asyncio.QueueFull:
+            return False
+        self._open_batches[key] = pr_numbers
+        return True
+
+    async def _create_review_queue(self):
+        """Build the bounded review queue (runs on the review loop)."""
+        return asyncio.Queue(maxsize=WEBHOOK_QUEUE_MAX)
+
+    def _log_worker_exit(self, future):
+        """Log the error that ended a review worker; workers otherwise run for the server's lifetime."""
+        if future.cancelled():
+            return
+        error = future.exception()
+        if error is not None:
+            log.error(f"❌ Review worker stopped: {error!r}")
+
+    async def _cancel_review_tasks(self):
+        """Cancel the review workers and in-flight reviews, waiting for them to unwind."""
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def _stop_review_loop(self):
+        """Cancel outstanding review tasks and stop the review loop (registered with atexit)."""
+        try:
+            asyncio.run_coroutine_threadsafe(self._cancel_review_tasks(), self._loop).result(timeout=5)
+        except Exception as e:
+            log.warning(f"⚠️  Review tasks did not stop cleanly: {e!r}")
+        self._loop.call_soon_threadsafe(self._loop.stop)
+
+    async def _review_worker(self):
+        """Process queued review batches one at a time for the lifetime of the server."""
+        while True:
+            platform, repository, pr_numbers, opened_at = await self._review_queue.get()
+            try:
+                # Give near-simultaneous PRs (rebase storms, bot batches) time to join
+                await asyncio.sleep(max(0.0, opened_at + REVIEW_BATCH_WINDOW - self._loop.time()))
+                key = (platform, repository)
+                if self._open_batches.get(key) is pr_numbers:
+                    del self._open_batches[key]
+                await self._process_batch_async(platform, repository, pr_numbers)
+            finally:
+                self._review_queue.task_done()
+
+    async def _process_batch_async(self, platform, repository, pr_numbers):
+        """Review a batch of PRs from one repository, one at a time, through a shared GitIntegration."""
+        try:
+            # One client per batch: authentication and the repository lookup are shared
+            git_integration = GitIntegration(server_type=platform, session=self.http_session)
+        except Exception as e:
+            log.error(f"❌ Async review failed: {platform}/{repository}: {str(e)}")
+            return
+        
+        if len(pr_numbers) > 1:
+            log.info(f"📦 Reviewing {len(pr_numbers)} PRs from {platform}/{repository} as one batch")
+        # Sequential, so each worker reviews one PR at a time and REVIEW_WORKERS stays the limit
+        for pr_number in pr_numbers:
+            await self._process_pr_async(platform, repository, pr_number, git_integration)
+
+    def _queue_full_response(self):
+        """503 response asking the sender to redeliver later."""
+        log.warning("⚠️  Review queue is full - rejecting webhook")
+        return (
+            jsonify({'error': 'Review queue is full', 'retry_after': QUEUE_FULL_RETRY_AFTER}),
+            503,
+            {'Retry-After': str(QUEUE_FULL_RETRY_AFTER)}
+        )
+
+    async def _process_pr_async(self, platform, repository, pr_number, git_integration=None):
+        """Process PR review as a task on the review loop."""
+        try:
+            log.info(f"🔄 Starting async review: {platform}/{repository}/PR#{pr_number}")
             
-            result = self._process_pr_sync(platform, repository, pr_number, post_comments=True)
+            result = await self._review_pr(
+                platform, repository, pr_number, post_comments=True, git_integration=git_integration
+            )
             
-            print(f"✅ Completed async review: {platform}/{repository}/PR#{pr_number}")
-            print(f"📊 Found {result.get('total_issues', 0)} total issues")
+            log.info(f"✅ Completed async review: {platform}/{repository}/PR#{pr_number}")
+            log.info(f"📊 Found {result.get('total_issues', 0)} total issues")
             
         except Exception as e:
-            print(f"❌ Async review failed: {platform}/{repository}/PR#{pr_number}: {str(e)}")
+            log.error(f"❌ Async review failed: {platform}/{repository}/PR#{pr_number}: {str(e)}")
 
     def _process_pr_sync(self, platform, repository, pr_number, post_comments=False):
-        """Synchronously process PR review."""
+        """Synchronously process PR review (runs it on the review loop and waits)."""
+        return asyncio.run_coroutine_threadsafe(
+            self._review_pr(platform, repository, pr_number, post_comments), self._loop
+        ).result()
+
+    async def _review_pr(self, platform, repository, pr_number, post_comments=False, git_integration=None):
+        """Fetch, analyze and report on a PR; blocking steps run off the event loop."""
         try:
-            # Initialize integrations
-            git_integration = GitIntegration(server_type=platform)
-            analyzer = CodeAnalysis()
-            inline_generator = InlineCommentGenerator()
+            # Initialize integrations unless the caller shares one across a batch
+            if git_integration is None:
+                git_integration = GitIntegration(server_type=platform, session=self.http_session)
             
             # Fetch PR data
-            print(f"📥 Fetching {platform} PR #{pr_number} from {repository}...")
-            pr_files = git_integration.fetch_pr(repository, pr_number)
+            log.info(f"📥 Fetching {platform} PR #{pr_number} from {repository}...")
+            # Filtered by extension during the fetch, so everything returned is reviewable
+            py_files = await git_integration.fetch_pr_async(repository, pr_number, REVIEW_EXTENSIONS)
+            
+            # Nothing to analyze (e.g. a docs-only PR) - skip analysis and report generation
+            if not py_files:
+                return {'error': 'No Python files found in PR', 'total_issues': 0, 'files_analyzed': 0}
+            
+            # Analyze all Python files in parallel worker processes
+            for file_data in py_files:
+                log.info(f"🔍 Analyzing {file_data['filename']}...")
+            loop = asyncio.get_running_loop()
+            file_results = await asyncio.gather(*(
+                loop.run_in_executor(self._analysis_executor, _analyze_one, file_data)
+                for file_data in py_files
+            ))
             
-            if not pr_files:
-                return {'error': 'No files found in PR', 'total_issues': 0}
-            
-            # Analyze each file
             analysis_results = []
             total_issues = 0
             
-            for file_data in pr_files:
-                if not file_data['filename'].endswith('.py'):
-                    continue  # Skip non-Python files
-                
-                print(f"🔍 Analyzing {file_data['filename']}...")
-                issues = analyzer.analyze_file(file_data['content'], file_data['filename'])
-                inline_comments = inline_generator.generate_inline_comments(file_data, issues)
-                
+            for file_data, (issues, inline_comments) in zip(py_files, file_results):
                 file_total_issues = sum(len(issue_list) for issue_list in issues.values())
                 total_issues += file_total_issues
                 
@@ -344,52 +658,88 @@ class WebhookServer:
                     'issue_count': file_total_issues
                 })
                 
-                print(f"📊 {file_data['filename']}: {file_total_issues} issues found")
+                log.info(f"📊 {file_data['filename']}: {file_total_issues} issues found")
             
             # Generate comprehensive feedback
-            feedback_gen = FeedbackGeneration()
-            report = feedback_gen.generate_comprehensive_feedback(analysis_results, pr_files)
+            report = await asyncio.to_thread(
+                self._feedback.generate_comprehensive_feedback, analysis_results, py_files
+            )
             
             # Post comments back to PR if requested
             if post_comments and total_issues > 0:
                 try:
-                    comment_posted = git_integration.post_review_comment(
+                    comment_posted = await git_integration.post_review_comment_async(
                         repository, pr_number, report
                     )
                     if comment_posted:
-                        print("✅ Posted comprehensive review to PR")
+                        log.info("✅ Posted comprehensive review to PR")
                     else:
-                        print("⚠️  Failed to post review comment")
+                        log.warning("⚠️  Failed to post review comment")
                 except Exception as e:
-                    print(f"⚠️  Comment posting failed: {str(e)}")
+                    log.warning(f"⚠️  Comment posting failed: {str(e)}")
             
+            # Summary only: per-file issues and inline comments are already in the report, and
+            # returning them too would keep a second copy alive for the HTTP response
             return {
                 'total_issues': total_issues,
                 'files_analyzed': len(analysis_results),
-                'report': report,
-                'analysis_results': analysis_results
+                'report': report
             }
             
         except Exception as e:
-            print(f"❌ PR processing error: {str(e)}")
+            log.error(f"❌ PR processing error: {str(e)}")
             raise
 
     def run(self, host='0.0.0.0', port=5001, debug=False):
-        """Run the webhook server."""
-        print(f"🚀 Starting PR Review Agent Webhook Server...")
-        print(f"🌐 Server will run on http://{host}:{port}")
-        print(f"📡 Webhook endpoints:")
-        print(f"   • GitHub:    http://{host}:{port}/webhook/github")
-        print(f"   • GitLab:    http://{host}:{port}/webhook/gitlab") 
-        print(f"   • Bitbucket: http://{host}:{port}/webhook/bitbucket")
-        print(f"   • Generic:   http://{host}:{port}/webhook/generic")
-        print(f"   • Manual:    http://{host}:{port}/review")
-        print(f"   • Health:    http://{host}:{port}/")
-        print()
-        
+        """Run the webhook server on the Flask development server (see serve() for production)."""
+        _print_banner(host, port)
         self.app.run(host=host, port=port, debug=debug, threaded=True)
 
 
+def _print_banner(host, port):
+    """Print the server address and webhook endpoints."""
+    print(f"🚀 Starting PR Review Agent Webhook Server...")
+    print(f"🌐 Server will run on http://{host}:{port}")
+    print(f"📡 Webhook endpoints:")
+    print(f"   • GitHub:    http://{host}:{port}/webhook/github")
+    print(f"   • GitLab:    http://{host}:{port}/webhook/gitlab") 
+    print(f"   • Bitbucket: http://{host}:{port}/webhook/bitbucket")
+    print(f"   • Generic:   http://{host}:{port}/webhook/generic")
+    print(f"   • Manual:    http://{host}:{port}/review")
+    print(f"   • Health:    http://{host}:{port}/")
+    print()
+
+
+def serve(host='0.0.0.0', port=5001, debug=False):
+    """Serve the webhook app: through Gunicorn outside development, else the Flask dev server.
+    
+    Decided before any WebhookServer exists, so under Gunicorn only the workers build one.
+    """
+    # Werkzeug's dev server only for development; otherwise hand the process to Gunicorn
+    development = debug or os.getenv('FLASK_ENV') == 'development'
+    if not development and importlib.util.find_spec('gunicorn') is not None:
+        _print_banner(host, port)
+        print(f"🦄 Serving with Gunicorn ({GUNICORN_THREADS} threads per worker)")
+        sys.stdout.flush()
+        os.execvp(sys.executable, [
+            sys.executable, '-m', 'gunicorn',
+            '--bind', f'{host}:{port}',
+            '--worker-class', 'gthread',
+            '--threads', str(GUNICORN_THREADS),
+            '--keep-alive', str(GUNICORN_KEEPALIVE),
+            '--chdir', os.path.dirname(os.path.abspath(__file__)),
+            'webhook_server:create_app()'
+        ])
+    if not development:
+        print("⚠️  Gunicorn not installed - falling back to the Flask development server")
+    
+    WebhookServer().run(host=host, port=port, debug=debug)
+
+
+def create_app():
+    """App factory for WSGI servers, e.g. gunicorn 'webhook_server:create_app()'."""
+    return WebhookServer().app
+
+
 if __name__ == "__main__":
-    webhook_server = WebhookServer()
-    webhook_server.run()
+    serve()